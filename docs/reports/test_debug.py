@@ -1,6 +1,7 @@
 
 import sys
 import os
+import time
 import traceback
 import logging
 
@@ -11,9 +12,13 @@ try:
     print(f"Python executable: {sys.executable}")
     print(f"CWD: {os.getcwd()}")
 
-    from ffbb_data_client import FFBBDataClient, TokenManager
+    from ffbb_data_client import FFBBDataClient
     from ffbb_data_client.utils.cache_manager import CacheManager, CacheConfig
 
+    # Tokens come from the scripts' shared token cache
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+    from shared import FFBBSession
+
     print("Imports successful.")
 
     # Reset
@@ -27,8 +32,9 @@ try:
 
     # Get tokens
     print("Getting tokens...")
-    tokens = TokenManager.get_tokens(use_cache=False)
-    print(f"Tokens obtained: {tokens.api_token[:5]}... {tokens.meilisearch_token[:5]}...")
+    session = FFBBSession()
+    tokens = session.tokens()
+    print(f"Tokens obtained: {tokens.api_token[:5]}... {tokens.meilisearch_token[:5]}... (valid until {time.ctime(session.expires_at)})")
 
     # Create client
     print("Creating client...")
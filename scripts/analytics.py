@@ -0,0 +1,175 @@
+"""
+Season analytics of volunteer staffing and carpools.
+export_season_data() writes the local snapshot (see snapshot.py) as Parquet
+or Arrow IPC datasets partitioned by season. The reports are vectorized
+pyarrow group-bys over those files: no Firestore read, no per-document loop.
+
+Usage: python sync.py export [--format parquet|arrow]
+       python sync.py report unfilled|volunteers|carpool [--season 2025-2026]
+
+Needs pyarrow (pip install pyarrow), which the sync itself does not.
+"""
+from shared import CHECKPOINT_DIR, METRICS
+import os
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+except ImportError: # only the export and the reports need it
+    pa = None
+
+ANALYTICS_DIR = os.path.join(CHECKPOINT_DIR, 'analytics')
+SEASON_START_MONTH = 8 # a season runs from August to July
+EXPORT_FORMATS = {"parquet": "parquet", "arrow": "ipc"} # --format -> pyarrow.dataset format
+
+# "2025-10-04" -> "2025-2026"
+SEASON_SQL = (f"(CAST(substr(m.date_iso, 1, 4) AS INTEGER) - (CAST(substr(m.date_iso, 6, 2) AS INTEGER) < {SEASON_START_MONTH}))"
+              f" || '-' || (CAST(substr(m.date_iso, 1, 4) AS INTEGER) + (CAST(substr(m.date_iso, 6, 2) AS INTEGER) >= {SEASON_START_MONTH}))")
+# Saturday of the match's Monday-Sunday week
+WEEKEND_SQL = "date(m.date_iso, 'weekday 0', '-1 day')"
+MATCH_KEYS_SQL = f"{SEASON_SQL} AS season, {WEEKEND_SQL} AS weekend, m.team"
+DATED = "m.date_iso GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+
+# Dataset -> (query over the snapshot tables, [(column, pyarrow type name), ...])
+EXPORTS = {
+    "matches": (
+        f"SELECT m.id, {MATCH_KEYS_SQL}, m.date_iso, m.time, m.opponent, m.is_home, m.location FROM matches m WHERE {DATED}",
+        [("match_id", "string"), ("season", "string"), ("weekend", "string"), ("team", "string"), ("date", "string"),
+         ("time", "string"), ("opponent", "string"), ("is_home", "bool_"), ("location", "string")],
+    ),
+    # capacity is null for unlimited roles (0 or Infinity in Firestore)
+    "roles": (
+        f"SELECT r.match_id, {MATCH_KEYS_SQL}, r.role_id, r.name,"
+        " CASE WHEN r.capacity = 0 OR r.capacity > 1e9 THEN NULL ELSE CAST(r.capacity AS INTEGER) END,"
+        f" json_array_length(r.volunteers) FROM roles r JOIN matches m ON m.id = r.match_id WHERE {DATED}",
+        [("match_id", "string"), ("season", "string"), ("weekend", "string"), ("team", "string"), ("role_id", "string"),
+         ("role", "string"), ("capacity", "int64"), ("filled", "int64")],
+    ),
+    "volunteers": (
+        f"SELECT r.match_id, {MATCH_KEYS_SQL}, r.name, v.value"
+        f" FROM roles r JOIN matches m ON m.id = r.match_id, json_each(r.volunteers) v WHERE {DATED}",
+        [("match_id", "string"), ("season", "string"), ("weekend", "string"), ("team", "string"), ("role", "string"),
+         ("volunteer", "string")],
+    ),
+    "carpool": (
+        f"SELECT c.match_id, {MATCH_KEYS_SQL}, c.entry_id, c.name, c.type, c.seats, c.status"
+        f" FROM carpool c JOIN matches m ON m.id = c.match_id WHERE {DATED}",
+        [("match_id", "string"), ("season", "string"), ("weekend", "string"), ("team", "string"), ("entry_id", "string"),
+         ("name", "string"), ("type", "string"), ("seats", "int64"), ("status", "string")],
+    ),
+}
+
+def require_pyarrow():
+    if pa is None:
+        print("The export and the reports need pyarrow: pip install pyarrow")
+        return False
+    return True
+
+def export_schema(columns):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+
+def export_season_data(snapshot, out_dir=ANALYTICS_DIR, fmt="parquet"):
+    """
+    Writes each EXPORTS dataset of `snapshot` under out_dir/<dataset>/season=<season>/,
+    replacing the previous export. Returns {dataset: rows}.
+    """
+    counts = {}
+    for name, (sql, columns) in EXPORTS.items():
+        schema = export_schema(columns)
+        with METRICS.span(f"export_{name}"):
+            rows = snapshot.conn.execute(sql).fetchall()
+            values = list(zip(*rows)) if rows else [()] * len(columns)
+            # SQLite has no booleans: build those columns as integers, then cast
+            arrays = [pa.array(column, pa.int8()).cast(field.type) if field.type == pa.bool_() else pa.array(column, field.type)
+                      for column, field in zip(values, schema)]
+            table = pa.Table.from_arrays(arrays, schema=schema)
+            path = os.path.join(out_dir, name)
+            shutil.rmtree(path, ignore_errors=True)
+            ds.write_dataset(table, path, format=EXPORT_FORMATS[fmt], partitioning=["season"], partitioning_flavor="hive")
+        counts[name] = table.num_rows
+    return counts
+
+def load_dataset(name, data_dir=ANALYTICS_DIR, season=None):
+    """
+    One exported dataset as a pyarrow Table, only `season` when given.
+    """
+    path = os.path.join(data_dir, name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No {name} export in {data_dir}. Create it with: python sync.py export")
+    fmt = "parquet"
+    for _, _, files in os.walk(path):
+        if any(f.endswith(".arrow") for f in files):
+            fmt = "ipc"
+            break
+    dataset = ds.dataset(path, format=fmt, partitioning="hive")
+    return dataset.to_table(filter=(ds.field("season") == season) if season else None)
+
+def unfilled_roles(roles):
+    """
+    Missing volunteers per team and weekend, over roles with a fixed capacity.
+    """
+    fixed = roles.filter(pc.is_valid(roles["capacity"]))
+    missing = pc.max_element_wise(pc.subtract(fixed["capacity"], fixed["filled"]), 0)
+    grouped = fixed.append_column("missing", missing).group_by(["team", "weekend"]).aggregate(
+        [("missing", "sum"), ("filled", "sum"), ("capacity", "sum")])
+    grouped = grouped.filter(pc.greater(grouped["missing_sum"], 0))
+    fill_rate = pc.round(pc.divide(pc.cast(grouped["filled_sum"], pa.float64()), grouped["capacity_sum"]), 2)
+    return pa.table({
+        "weekend": grouped["weekend"], "team": grouped["team"], "missing": grouped["missing_sum"],
+        "filled": grouped["filled_sum"], "capacity": grouped["capacity_sum"], "fill_rate": fill_rate,
+    }).sort_by([("weekend", "ascending"), ("team", "ascending")])
+
+def volunteer_load(volunteers):
+    """
+    Role slots, matches and weekends covered per volunteer, busiest first.
+    """
+    grouped = volunteers.group_by("volunteer").aggregate(
+        [("role", "count"), ("match_id", "count_distinct"), ("weekend", "count_distinct")])
+    return pa.table({
+        "volunteer": grouped["volunteer"], "slots": grouped["role_count"],
+        "matches": grouped["match_id_count_distinct"], "weekends": grouped["weekend_count_distinct"],
+    }).sort_by([("slots", "descending"), ("volunteer", "ascending")])
+
+def carpool_balance(carpool):
+    """
+    Seats offered by drivers against passengers per team and weekend, the
+    largest shortfalls first.
+    """
+    is_driver = pc.equal(carpool["type"], "driver")
+    table = carpool.append_column("offered", pc.if_else(is_driver, pc.fill_null(carpool["seats"], 0), 0)) \
+                   .append_column("driver", pc.cast(is_driver, pa.int64())) \
+                   .append_column("passenger", pc.cast(pc.equal(carpool["type"], "passenger"), pa.int64()))
+    grouped = table.group_by(["team", "weekend"]).aggregate(
+        [("driver", "sum"), ("offered", "sum"), ("passenger", "sum")])
+    return pa.table({
+        "weekend": grouped["weekend"], "team": grouped["team"], "drivers": grouped["driver_sum"],
+        "seats": grouped["offered_sum"], "passengers": grouped["passenger_sum"],
+        "balance": pc.subtract(grouped["offered_sum"], grouped["passenger_sum"]),
+    }).sort_by([("balance", "ascending"), ("weekend", "ascending"), ("team", "ascending")])
+
+# Report name -> (dataset, function)
+REPORTS = {
+    "unfilled": ("roles", unfilled_roles),
+    "volunteers": ("volunteers", volunteer_load),
+    "carpool": ("carpool", carpool_balance),
+}
+
+def run_report(name, data_dir=ANALYTICS_DIR, season=None):
+    dataset, report = REPORTS[name]
+    with METRICS.span(f"report_{name}"):
+        return report(load_dataset(dataset, data_dir, season))
+
+def print_table(table, limit=None):
+    rows = table.slice(0, limit).to_pylist() if limit else table.to_pylist()
+    widths = {name: max([len(name)] + [len(str(row[name])) for row in rows]) for name in table.column_names}
+    print("  ".join(f"{name:<{widths[name]}}" for name in table.column_names))
+    for row in rows:
+        print("  ".join(f"{str(row[name]):<{widths[name]}}" for name in table.column_names))
+    if limit and table.num_rows > limit:
+        print(f"... {table.num_rows - limit} more rows")
+
+def write_csv(table, path):
+    pa_csv.write_csv(table, path)
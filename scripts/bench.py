@@ -0,0 +1,137 @@
+"""
+Benchmarks of the sync pipeline against the local fakes (no credentials needed).
+
+Times index building, matching, write-back and a full sync run at 1x, 10x and
+100x a season's volume, and can gate on a saved baseline:
+
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --max-regression 0.25
+
+A baseline also holds the time of a fixed calibration workload, and its
+stage times are scaled by how much slower or faster that workload runs now,
+so a baseline saved on one machine can gate runs on another (CI).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Keep checkpoints and the FFBB cache of benchmark runs away from the real ones
+os.environ.setdefault('FFBB_CACHE_PATH', os.path.join(tempfile.mkdtemp(prefix="scba-bench-"), 'ffbb.sqlite'))
+
+from fakes import FakeFFBBClient, FakeFirestore, season_docs
+from venues import VenueGazetteer
+from shared import BatchWriter, FFBBFetcher, FFBBMatchIndex
+import sync
+
+STAGES = ["index", "match", "write", "sync"]
+
+def time_best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def calibration_work():
+    # Dict and string churn, the kind of work the sync stages do
+    counts = {}
+    for i in range(200000):
+        key = str(i * 7919 % 100003)[-3:]
+        counts[key] = counts.get(key, 0) + 1
+    return sorted(counts.items())
+
+def calibrate(repeat=5):
+    return time_best(calibration_work, repeat)
+
+def bench_scale(scale, repeat=3, latency=0.0, workers=1):
+    ffbb = FakeFFBBClient(scale=scale, latency=latency)
+    docs = season_docs(ffbb)
+    fetcher = FFBBFetcher(ffbb, rate=None)
+    results = {"docs": len(docs), "rencontres": len(ffbb.rencontres)}
+    bench_dir = tempfile.mkdtemp(prefix="scba-bench-")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        index = FFBBMatchIndex.build(fetcher, ffbb.club_id)
+    db = FakeFirestore({"matches": docs})
+    snapshots = list(db.collection("matches").stream())
+
+    def match():
+        for doc in snapshots:
+            sync.SyncItem(doc, doc.to_dict(), index)
+
+    def write():
+        target = FakeFirestore({"matches": docs})
+        with BatchWriter(target) as writer:
+            for doc_id in docs:
+                writer.update(doc_id, {"time": "20:00"})
+
+    def full_sync():
+        target = FakeFirestore({"matches": docs})
+        # A fresh gazetteer per run: the sync stage measures a cold venue lookup
+        reconcilers = [sync.TimeReconciler(fetcher),
+                       sync.AddressReconciler(fetcher, VenueGazetteer(os.path.join(tempfile.mkdtemp(dir=bench_dir), "venues.json")))]
+        sync.run_sync(target, fetcher, reconcilers, apply=True, workers=workers, checkpoint_name="bench")
+
+    results["index"] = time_best(lambda: FFBBMatchIndex.build(fetcher, ffbb.club_id), repeat)
+    results["match"] = time_best(match, repeat)
+    results["write"] = time_best(write, repeat)
+    results["sync"] = time_best(full_sync, repeat)
+    return results
+
+def print_table(results):
+    print(f"{'scale':>6} {'docs':>7} {'rencontres':>11} " + " ".join(f"{stage:>9}" for stage in STAGES))
+    for scale, row in results.items():
+        print(f"{scale + 'x':>6} {row['docs']:>7} {row['rencontres']:>11} " + " ".join(f"{row[stage] * 1000:>7.1f}ms" for stage in STAGES))
+
+def check_regressions(results, baseline, max_regression, speed=1.0):
+    # `speed`: this machine's calibration time over the baseline's
+    failures = []
+    for scale, row in results.items():
+        for stage in STAGES:
+            reference = baseline.get(scale, {}).get(stage)
+            if reference and row[stage] > reference * speed * (1 + max_regression):
+                failures.append(f"{scale}x {stage}: {row[stage] * 1000:.1f}ms vs baseline {reference * speed * 1000:.1f}ms")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sync pipeline against local fakes.")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated multiples of a season's volume.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the fastest is kept.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per FFBB call.")
+    parser.add_argument("--workers", type=int, default=1, help="Matching processes for the sync stage (see sync.py --workers).")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline JSON file.")
+    parser.add_argument("--baseline", help="Compare against this baseline and fail on regressions.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = +25%%).")
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    results = {}
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        results[str(scale)] = bench_scale(scale, repeat=args.repeat, latency=args.latency, workers=args.workers)
+    print_table(results)
+
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"calibration": calibration, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        speed = calibration / baseline["calibration"]
+        print(f"Calibration: {calibration * 1000:.1f}ms vs baseline {baseline['calibration'] * 1000:.1f}ms (x{speed:.2f})")
+        failures = check_regressions(results, baseline["results"], args.max_regression, speed)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        print("Benchmark gate: FAILURE" if failures else "Benchmark gate: SUCCESS")
+        sys.exit(1 if failures else 0)
@@ -1,95 +1,11 @@
+from sync import add_explain_arguments, cmd_explain
+import argparse
 
-from shared import init_firebase, init_ffbb, normalize_team_name, extract_team_number_local, extract_team_number_ffbb
-
-def debug_match():
-    # Init Firebase and FFBB
-    db = init_firebase()
-    client = init_ffbb()
-
-    # Specific Target: 2026-02-28, U11 M1 vs CLERMONT BASKET - 1
-    # Firestore ID from previous logs: KlUeQK7SeKGtuyFJ9QWK (allegedly)
-    # Or just search by criteria if ID uncertain
-
-    print("--- DEBUGGING 2026-02-28 ---")
-
-    # 1. Fetch FFBB Data for that date
-    org = client.get_organisme(9326) # SCBA
-    candidates = []
-
-    print(f"Scanning {len(org.engagements)} engagements...")
-    for eng in org.engagements:
-        poule_id = eng.idPoule.id if hasattr(eng.idPoule, 'id') else str(eng.idPoule)
-        # Optimization: verify_match_times pre-fetches all. we just want to see if we find it.
-        try:
-            poule = client.get_poule(poule_id)
-            if poule.rencontres:
-                for m in poule.rencontres:
-                    d = getattr(m, 'date_rencontre', '')
-                    if "2026-02-28" in str(d):
-                        candidates.append(m)
-        except: pass
-
-    print(f"\nFound {len(candidates)} FFBB matches on 2026-02-28:")
-    for m in candidates:
-        print(f"  FFBB Match: {m.nomEquipe1} vs {m.nomEquipe2}")
-        print(f"     Time: {m.date_rencontre}")
-
-        # Test extraction logic
-        n1 = normalize_team_name(m.nomEquipe1)
-        n2 = normalize_team_name(m.nomEquipe2)
-
-        is_n1_us = "stadeclermontois" in n1
-        is_n2_us = "stadeclermontois" in n2
-
-        ffbb_team_num = "?"
-        if is_n1_us: ffbb_team_num = extract_team_number_ffbb(m.nomEquipe1)
-        elif is_n2_us: ffbb_team_num = extract_team_number_ffbb(m.nomEquipe2)
-
-        print(f"     Us? {is_n1_us or is_n2_us} (Team {ffbb_team_num})")
-
-    # 2. Check Firestore Doc
-    print("\nChecking Firestore...")
-    matches = db.collection("matches").where("dateISO", "==", "2026-02-28").stream()
-    found_any = False
-    for doc in matches:
-        d = doc.to_dict()
-        t = d.get("team", "")
-        o = d.get("opponent", "")
-        time = d.get("time", "")
-        is_home = d.get("isHome", None) # boolean or None
-
-        if "U11" in t and "CLERMONT" in o.upper():
-            found_any = True
-            print(f"\nFirestore Match: {t} vs {o}")
-            print(f"  Time: {time}")
-            print(f"  isHome: {is_home}")
-            print(f"  ID: {doc.id}")
-
-            local_team_num = extract_team_number_local(t)
-            print(f"  Local Team Num extracted: {local_team_num}")
-
-            # Simulate matching logic
-            print("  --- SIMULATING MATCHING ---")
-            for m in candidates:
-                n1 = normalize_team_name(m.nomEquipe1)
-                n2 = normalize_team_name(m.nomEquipe2)
-                opp_norm = normalize_team_name(o)
-
-                is_n1_us = "stadeclermontois" in n1
-                is_n2_us = "stadeclermontois" in n2
-
-                ffbb_team_num = None
-                if is_n1_us: ffbb_team_num = extract_team_number_ffbb(m.nomEquipe1)
-                elif is_n2_us: ffbb_team_num = extract_team_number_ffbb(m.nomEquipe2)
-
-                match_opp = (opp_norm in n1) or (opp_norm in n2)
-                print(f"  vs {m.nomEquipe1}/{m.nomEquipe2}: OppMatch={match_opp}, FFBB_Team={ffbb_team_num}, Local_Team={local_team_num}")
-
-                if match_opp:
-                     if ffbb_team_num and ffbb_team_num != local_team_num:
-                         print("     -> SKIPPED (Team Num Mismatch)")
-                     else:
-                         print("     -> MATCH FOUND!")
-
+# Same as: sync.py explain. Defaults reproduce the original investigation
+# (U11 M1 vs CLERMONT BASKET on 2026-02-28).
 if __name__ == "__main__":
-    debug_match()
+    parser = argparse.ArgumentParser(description="Explain how FFBB matches are picked for one date (same as: sync.py explain).")
+    add_explain_arguments(parser, default_date="2026-02-28")
+    parser.set_defaults(team="U11", opponent="CLERMONT")
+    args = parser.parse_args()
+    cmd_explain(args)
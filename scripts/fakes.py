@@ -0,0 +1,468 @@
+"""
+Local stand-ins for the FFBB API client and Firestore.
+Lets the sync scripts and bench.py run without credentials or network.
+
+FakeFFBBClient serves synthetic organisme/poule/rencontre/salle data (or
+responses recorded in the FFBB cache) with a configurable per-call latency.
+FakeFirestore implements the subset of the Firestore client the scripts use.
+"""
+from shared import DEFAULT_ROLES, NO_GOUTER_TEAMS, local_team_name
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import operator
+import pickle
+import random
+import sqlite3
+import time
+
+CLUB_NAME = "STADE CLERMONTOIS BASKET AUVERGNE"
+
+OPPONENT_CLUBS = [
+    "CLERMONT BASKET", "BC LEMPDES", "ROYAT ORCINES CLUB BASKET BALL", "SC BILLOM",
+    "AIGUEPERSE BASKET CLUB", "BC VAL DE VEYRE ORCET", "AL AUBIERE", "NEYRAT BASKET ASSOCIATION",
+    "AMICALE LAIQUE BASKET LUSSAT", "CLUB SPORTIF DE PONT DE DORE", "RIORGES BC", "SCA CUSSET",
+    "ENFANTS DU FOREZ", "NEULISE AL", "COTE ROANNAISE", "ANDREZIEUX BOUTHEON LOIRE SUD BASKET",
+    "MONTBRISON MASCULINS BC", "US SAINT GEORGES LES ANCIZES", "SORGUES BASKET CLUB", "AGDE BASKET",
+]
+
+# (FFBB category code, gender, our team numbers) for one season's engagements
+SEASON_TEAMS = [
+    ("SE", "M", (1, 2)), ("U18", "M", (1, 2)), ("U15", "M", (1, 2)), ("U13", "M", (1,)),
+    ("U11", "M", (1, 2)), ("U9", "M", (1,)), ("SE", "F", (1,)), ("U15", "F", (1,)), ("U13", "F", (1,)),
+]
+
+SEASON_START = datetime(2025, 9, 20, tzinfo=timezone.utc)
+# Club members signing up for home-game roles and away-game carpools
+VOLUNTEERS = ["Alice", "Bruno", "Chloé", "David", "Emma", "Farid", "Gaëlle", "Hugo", "Inès", "Julien", "Karim", "Léa"]
+
+KICKOFFS = ["10:00", "11:00", "13:30", "14:00", "15:30", "16:00", "17:30", "18:00", "20:00", "20:30"]
+
+class FakeFFBBClient:
+    """
+    Synthetic FFBB data for `scale` seasons of engagements. Every call
+    sleeps `latency` seconds and is counted in `calls`.
+    """
+    def __init__(self, scale=1, latency=0.0, seed=42, club_id=9326):
+        self.latency = latency
+        self.club_id = club_id
+        self.calls = {}
+        self.organismes = {}
+        self.poules = {}
+        self.rencontres = {}
+        self.salles = {}
+        self._generate(scale, random.Random(seed))
+
+    def _generate(self, scale, rng):
+        engagements = []
+        club_engagements = {club: [] for club in OPPONENT_CLUBS}
+        next_rencontre_id = 1
+        for season in range(scale):
+            start = SEASON_START + timedelta(days=364 * season)
+            for category, gender, numbers in SEASON_TEAMS:
+                for number in numbers:
+                    poule_id = str(200000 + len(self.poules))
+                    competition = SimpleNamespace(categorie=SimpleNamespace(code=category), sexe=gender)
+                    engagements.append(SimpleNamespace(idPoule=SimpleNamespace(id=poule_id), idCompetition=competition))
+
+                    us = f"{CLUB_NAME} - {number}"
+                    opponents = [f"{club} - {rng.randint(1, 2)}" for club in rng.sample(OPPONENT_CLUBS, 9)]
+                    for opponent in opponents:
+                        club_engagements[opponent.rsplit(" - ", 1)[0]].append(engagements[-1])
+                    rencontres = []
+                    for day, opponent in enumerate(opponents * 2):
+                        is_home = rng.random() < 0.5
+                        salle_id = str(5000 + (rng.randrange(6) if is_home else OPPONENT_CLUBS.index(opponent.rsplit(" - ", 1)[0]) + 10))
+                        self._add_salle(salle_id)
+                        kickoff = rng.choice(KICKOFFS)
+                        date = start + timedelta(days=7 * day + rng.randint(0, 1))
+                        rencontre = SimpleNamespace(
+                            id=next_rencontre_id,
+                            date_rencontre=f"{date:%Y-%m-%d}T{kickoff}:00",
+                            nomEquipe1=us if is_home else opponent,
+                            nomEquipe2=opponent if is_home else us,
+                            salle={"id": salle_id},
+                        )
+                        next_rencontre_id += 1
+                        rencontres.append(rencontre)
+                        self.rencontres[rencontre.id] = rencontre
+
+                        # The rest of the poule plays the same weekend
+                        others = [o for o in opponents if o != opponent]
+                        for i in range(0, 8, 2):
+                            home_club = others[i].rsplit(" - ", 1)[0]
+                            other = SimpleNamespace(
+                                id=next_rencontre_id,
+                                date_rencontre=f"{date:%Y-%m-%d}T{rng.choice(KICKOFFS)}:00",
+                                nomEquipe1=others[i], nomEquipe2=others[i + 1],
+                                salle={"id": str(5010 + OPPONENT_CLUBS.index(home_club))},
+                            )
+                            next_rencontre_id += 1
+                            rencontres.append(other)
+                            self.rencontres[other.id] = other
+                    self.poules[poule_id] = SimpleNamespace(id=poule_id, rencontres=rencontres)
+        self.organismes[self.club_id] = SimpleNamespace(id=self.club_id, nom=CLUB_NAME, engagements=engagements)
+        # Opponents get organismes too, engaged in the poules they share with us
+        for club, club_engs in club_engagements.items():
+            club_id = self.partner_id(club)
+            self.organismes[club_id] = SimpleNamespace(id=club_id, nom=club, engagements=club_engs)
+
+    @staticmethod
+    def partner_id(club):
+        return 10000 + OPPONENT_CLUBS.index(club)
+
+    def _add_salle(self, salle_id):
+        if salle_id not in self.salles:
+            n = int(salle_id) - 5000
+            self.salles[salle_id] = SimpleNamespace(
+                id=salle_id, libelle=f"Gymnase {n}", adresse=f"{n} Rue du Stade",
+                code_postal="63000", ville="Clermont-Ferrand",
+            )
+
+    @classmethod
+    def from_cache(cls, path, latency=0.0):
+        """
+        Serves responses recorded by shared.FFBBCache instead of synthetic data.
+        """
+        client = cls.__new__(cls)
+        client.latency = latency
+        client.calls = {}
+        client.organismes, client.poules, client.rencontres, client.salles = {}, {}, {}, {}
+        stores = {"organisme": client.organismes, "poule": client.poules,
+                  "rencontre": client.rencontres, "salle": client.salles}
+        conn = sqlite3.connect(path)
+        for kind, key, payload in conn.execute("SELECT kind, key, payload FROM responses"):
+            if kind in stores:
+                value = pickle.loads(payload)
+                stores[kind][key] = value
+                if kind == "organisme":
+                    client.club_id = int(key)
+        conn.close()
+        return client
+
+    def _call(self, kind, store, key):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        value = store.get(key)
+        if value is None:
+            value = store.get(str(key))
+        if value is None:
+            try:
+                value = store.get(int(key))
+            except (TypeError, ValueError):
+                pass
+        return value
+
+    def get_organisme(self, organisme_id):
+        return self._call("organisme", self.organismes, organisme_id)
+
+    def get_poule(self, poule_id):
+        return self._call("poule", self.poules, poule_id)
+
+    def get_rencontre(self, rencontre_id):
+        return self._call("rencontre", self.rencontres, rencontre_id)
+
+    def get_salle(self, salle_id):
+        return self._call("salle", self.salles, salle_id)
+
+    def search_salles(self, query):
+        self.calls["search_salles"] = self.calls.get("search_salles", 0) + 1
+        return SimpleNamespace(hits=[])
+
+def fake_roles(rng, team):
+    # Home-game roles, as the app creates them for `team`, partly filled
+    roles = []
+    home_roles = [(name, capacity) for name, capacity in DEFAULT_ROLES if not (name == "Goûter" and team in NO_GOUTER_TEAMS)]
+    for n, (name, capacity) in enumerate(home_roles, start=1):
+        wanted = rng.randint(0, capacity) if capacity else rng.randint(0, 3)
+        roles.append({"id": str(n), "name": name, "capacity": capacity or float("inf"),
+                      "volunteers": rng.sample(VOLUNTEERS, wanted)})
+    return roles
+
+def fake_carpool(rng):
+    # Away-game carpool: a few drivers and passengers
+    entries = []
+    for n, name in enumerate(rng.sample(VOLUNTEERS, rng.randint(0, 5)), start=1):
+        if rng.random() < 0.4:
+            entries.append({"id": f"c{n}", "name": name, "type": "driver", "seats": rng.randint(1, 4), "status": "available"})
+        else:
+            entries.append({"id": f"c{n}", "name": name, "type": "passenger", "status": "available"})
+    return entries
+
+def season_docs(ffbb, seed=42, time_error_rate=0.1, incomplete_location_rate=0.3):
+    """
+    Firestore match documents for every rencontre of `ffbb` involving our club,
+    with a share of wrong kickoff times and incomplete locations to fix, and
+    volunteers (home) or carpool entries (away).
+    """
+    rng = random.Random(seed)
+    staffing_rng = random.Random(seed + 1) # separate, so the docs' other fields don't depend on it
+    docs = {}
+    org = ffbb.organismes[ffbb.club_id]
+    for eng in org.engagements:
+        category = eng.idCompetition.categorie.code
+        gender = eng.idCompetition.sexe
+        for m in ffbb.poules[eng.idPoule.id].rencontres:
+            if CLUB_NAME not in (m.nomEquipe1 + m.nomEquipe2):
+                continue
+            is_home = m.nomEquipe1.startswith(CLUB_NAME)
+            us, opponent = (m.nomEquipe1, m.nomEquipe2) if is_home else (m.nomEquipe2, m.nomEquipe1)
+            number = us.rsplit(" - ", 1)[1]
+            date, kickoff = m.date_rencontre.split("T")
+            kickoff = kickoff[:5]
+            if rng.random() < time_error_rate:
+                kickoff = rng.choice(KICKOFFS)
+            location = "Gymnase" if rng.random() < incomplete_location_rate else f"{ffbb.salles[m.salle['id']].libelle}, 1 Rue du Stade, 63000 Clermont-Ferrand"
+            team = local_team_name(category, gender, number)
+            docs[f"m{m.id}"] = {
+                "team": team,
+                "opponent": opponent.rsplit(" - ", 1)[0],
+                "dateISO": date,
+                "time": kickoff.replace(":", "h"),
+                "location": location,
+                "isHome": is_home,
+                "roles": fake_roles(staffing_rng, team) if is_home else [],
+                "carpool": [] if is_home else fake_carpool(staffing_rng),
+            }
+    return docs
+
+# --- Firestore ---
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, update_time):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data else None
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self):
+        db = self.collection.db
+        db.reads += 1
+        entry = db.store(self.collection.name).get(self.id)
+        if entry is None:
+            return FakeDocumentSnapshot(self, None, None)
+        return FakeDocumentSnapshot(self, dict(entry[0]), entry[1])
+
+    def set(self, data, merge=False):
+        self.collection.db._write(self.collection.name, self.id, data, merge=merge)
+
+    def update(self, fields):
+        self.collection.db._write(self.collection.name, self.id, fields, merge=True, must_exist=True)
+
+    def delete(self):
+        self.collection.db._delete(self.collection.name, self.id)
+
+class FakeQuery:
+    OPS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+    def __init__(self, db, name, filters=(), fields=None, order=None, max_results=None):
+        self.db = db
+        self.name = name
+        self._filters = tuple(filters)
+        self._fields = fields
+        self._order = order
+        self._limit = max_results
+
+    def _copy(self, **changes):
+        params = dict(filters=self._filters, fields=self._fields, order=self._order, max_results=self._limit)
+        params.update(changes)
+        return FakeQuery(self.db, self.name, **params)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, self.OPS[op], value),))
+
+    def order_by(self, field, direction=None):
+        return self._copy(order=field)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def limit(self, count):
+        return self._copy(max_results=count)
+
+    def stream(self):
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        rows = [(doc_id, data, update_time) for doc_id, (data, update_time) in self.db.store(self.name).items()
+                if self.matches(data)]
+        if self._order:
+            rows.sort(key=lambda row: (row[1].get(self._order) is None, row[1].get(self._order), row[0]))
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        collection = FakeCollection(self.db, self.name)
+        for n, (doc_id, data, update_time) in enumerate(rows):
+            if self.db.page_latency and n % self.db.STREAM_PAGE_SIZE == 0:
+                time.sleep(self.db.page_latency)
+            self.db.reads += 1
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield FakeDocumentSnapshot(FakeDocumentReference(collection, doc_id), dict(data), update_time)
+
+    def get(self):
+        return list(self.stream())
+
+    def matches(self, data):
+        return all(field in data and op(data[field], value) for field, op, value in self._filters)
+
+    def on_snapshot(self, callback):
+        return FakeWatch(self, callback)
+
+class FakeWatch:
+    """
+    Listener of FakeQuery.on_snapshot. Like Firestore, the callback first gets
+    every matching document as ADDED, then one call per ADDED, MODIFIED or
+    REMOVED change, synchronously from the write. `docs` only holds the
+    changed documents.
+    """
+    def __init__(self, query, callback):
+        self.query = query
+        self.callback = callback
+        snapshots = list(query.stream())
+        self.ids = {doc.id for doc in snapshots}
+        query.db._watches.append(self)
+        callback(snapshots, [self._change("ADDED", doc) for doc in snapshots], datetime.now(timezone.utc))
+
+    @staticmethod
+    def _change(kind, doc):
+        return SimpleNamespace(type=SimpleNamespace(name=kind), document=doc)
+
+    def changed(self, name, doc_id):
+        if name != self.query.name:
+            return
+        entry = self.query.db.store(name).get(doc_id)
+        reference = FakeDocumentReference(FakeCollection(self.query.db, name), doc_id)
+        if entry is not None and self.query.matches(entry[0]):
+            kind = "MODIFIED" if doc_id in self.ids else "ADDED"
+            self.ids.add(doc_id)
+            doc = FakeDocumentSnapshot(reference, dict(entry[0]), entry[1])
+        elif doc_id in self.ids:
+            kind = "REMOVED"
+            self.ids.discard(doc_id)
+            doc = FakeDocumentSnapshot(reference, None, None)
+        else:
+            return
+        self.callback([doc], [self._change(kind, doc)], datetime.now(timezone.utc))
+
+    def unsubscribe(self):
+        if self in self.query.db._watches:
+            self.query.db._watches.remove(self)
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, name):
+        super().__init__(db, name)
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            doc_id = f"auto{self.db.next_id()}"
+        return FakeDocumentReference(self, doc_id)
+
+class FakeWriteBatch:
+    """
+    Applies all its writes or none, like a Firestore WriteBatch: an update of
+    a missing document fails the whole commit before anything is written.
+    """
+    def __init__(self, db):
+        self.db = db
+        self._ops = [] # [(kind, reference, data, merge), ...]
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(("set", reference, data, merge))
+
+    def update(self, reference, fields):
+        self._ops.append(("update", reference, fields, True))
+
+    def delete(self, reference):
+        self._ops.append(("delete", reference, None, False))
+
+    def commit(self):
+        if len(self._ops) > 500:
+            raise ValueError("A write batch can contain at most 500 operations.")
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        exists = {} # (collection, id) -> whether it exists once the earlier ops applied
+        for kind, reference, _, _ in self._ops:
+            key = (reference.collection.name, reference.id)
+            if kind == "update" and not exists.get(key, reference.id in self.db.store(key[0])):
+                raise KeyError(f"No document to update: {key[0]}/{key[1]}")
+            exists[key] = kind != "delete"
+        self.db.commits += 1
+        for kind, reference, data, merge in self._ops:
+            if kind == "set":
+                reference.set(data, merge=merge)
+            elif kind == "update":
+                reference.update(data)
+            else:
+                reference.delete()
+        self._ops = []
+
+class FakeFirestore:
+    """
+    In-memory Firestore: collections, projected/filtered queries, write batches
+    and update_time bookkeeping. `latency` is added to every stream and commit,
+    `page_latency` to every STREAM_PAGE_SIZE documents streamed.
+    """
+    STREAM_PAGE_SIZE = 100
+
+    def __init__(self, collections=None, latency=0.0, page_latency=0.0):
+        self.latency = latency
+        self.page_latency = page_latency
+        self._stores = {}
+        self._ids = 0
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self._watches = []
+        for name, docs in (collections or {}).items():
+            for doc_id, data in docs.items():
+                self._write(name, doc_id, data, count=False)
+
+    def store(self, name):
+        return self._stores.setdefault(name, {})
+
+    def next_id(self):
+        self._ids += 1
+        return self._ids
+
+    def _write(self, name, doc_id, data, merge=False, must_exist=False, count=True):
+        store = self.store(name)
+        if must_exist and doc_id not in store:
+            raise KeyError(f"No document to update: {name}/{doc_id}")
+        current = dict(store[doc_id][0]) if merge and doc_id in store else {}
+        current.update(data)
+        store[doc_id] = (current, datetime.now(timezone.utc))
+        if count:
+            self.writes += 1
+        self._notify(name, doc_id)
+
+    def _delete(self, name, doc_id):
+        self.store(name).pop(doc_id, None)
+        self.writes += 1
+        self._notify(name, doc_id)
+
+    def _notify(self, name, doc_id):
+        for watch in list(self._watches):
+            watch.changed(name, doc_id)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references, field_paths=None):
+        if self.latency:
+            time.sleep(self.latency)
+        for reference in references:
+            yield reference.get()
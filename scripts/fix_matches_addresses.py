@@ -1,261 +1,22 @@
 
-from shared import CLUB_MAPPING, init_firebase, init_ffbb, normalize_team_name
+from shared import init_firebase, init_ffbb_from_args
+from sync import AddressReconciler, add_sync_arguments, run_sync, sync_options
 import argparse
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-KNOWN_VENUES = {
-    "Maison des Sports": "Maison des Sports, Place des Bughes, 63000 Clermont-Ferrand",
-    "Gymnase Fleury": "Gymnase Fleury, Rue Pierre de Coubertin, 63000 Clermont-Ferrand",
-    "Gymnase Granouillet": "Gymnase Granouillet, 45 Rue de Châteaudun, 63000 Clermont-Ferrand",
-    "Gymnase Autun": "Gymnase Autun, Rue d'Autun, 63000 Clermont-Ferrand",
-    "Gymnase Thevenet": "Gymnase Thevenet, Rue de la Grande Tour, 63000 Clermont-Ferrand",
-    "Complexe Sportif Paul Bourissou": "Complexe Sportif Paul Bourissou, Rue du stade, 63960 Veyre-Monton",
-}
-
-# Cache
-POULE_CACHE = {} # poule_id -> list of matches
-SALLE_CACHE = {} # salle_id -> address string
-MATCH_DETAILS_CACHE = {} # match_id -> details
-
-def get_salle_address(salle_id, client):
-    if not salle_id:
-        return None
-    if salle_id in SALLE_CACHE:
-        return SALLE_CACHE[salle_id]
-
-    try:
-        salle = client.get_salle(str(salle_id))
-        if salle:
-            data = salle.model_dump() if hasattr(salle, 'model_dump') else vars(salle)
-            nom = data.get("libelle") or data.get("nom")
-            adresse = data.get("adresse") or data.get("adresse1")
-            cp = data.get("code_postal") or data.get("codePostal", "")
-            ville = data.get("ville") or data.get("commune", "")
-            if isinstance(ville, dict):
-                ville = ville.get("libelle", "")
-
-            full_addr = str(adresse) if adresse else ""
-            if cp or ville:
-                full_addr += f", {cp} {ville}".rstrip()
-
-            if nom and nom.lower() not in full_addr.lower():
-                full_addr = f"{nom}, {full_addr}"
-
-            SALLE_CACHE[salle_id] = full_addr
-            return full_addr
-    except Exception as e:
-        print(f"Error fetching salle {salle_id}: {e}")
-    return None
-    return None
-
-def get_match_details_address(match_id, client):
-    if match_id in MATCH_DETAILS_CACHE:
-        return MATCH_DETAILS_CACHE[match_id]
-
-    try:
-        rencontre = client.get_rencontre(str(match_id))
-        if rencontre:
-            data = rencontre.model_dump() if hasattr(rencontre, 'model_dump') else vars(rencontre)
-            salle_id = data.get("salle")
-            if isinstance(salle_id, dict):
-                salle_id = salle_id.get("id")
-            if salle_id:
-                address = get_salle_address(salle_id, client)
-                MATCH_DETAILS_CACHE[match_id] = address
-                return address
-    except Exception as e:
-        print(f"Error fetching match {match_id}: {e}")
-    return None
-
-def fix_address(db, ffbb_client, dry_run=True):
-    matches_ref = db.collection("matches")
-    # Fetch all future matches or all matches? Let's do all for now or filter by date?
-    # User likely cares about future. But let's check all to be safe.
-    docs = matches_ref.stream()
-
-    print(f"\n--- {'DRY RUN' if dry_run else 'LIVE UPDATE'} MODE ---\n")
-
-    # Pre-fetch Club Engagements
-    # Assuming most matches are from SCBA
-    club_id = CLUB_MAPPING.get("SCBA", 9326)
-    print(f"Fetching engagements for Club ID {club_id}...")
-    org = ffbb_client.get_organisme(club_id)
-    if not org or not org.engagements:
-        print("Could not fetch club engagements.")
-        return
-
-    # Map: Date -> [List of Matches in Club's Poules]
-    # To avoid iterating all poules for every match document
-    print("Building Match Index from FFBB (this may take a moment)...")
-    ffbb_matches_by_date = {} # "YYYY-MM-DD" -> [MatchObj, ...]
-
-    # We only care about poules referenced in engagements
-    # To optimize, we can fetch poules lazily or pre-fetch all.
-    # Given the number of engagements (31), pre-fetching might be slow but robust.
-    # Let's do lazy: Fetch poule only if we haven't seen it.
-    # But we need to match by DATE. So we need to index.
-    # Let's iterate engagements, fetch poules, and index matches.
-
-    total_engagements = len(org.engagements)
-    print(f"Found {total_engagements} engagements. Scanning poules...")
-
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-
-    def fetch_poule_matches(engagement):
-        poule_id_obj = getattr(engagement, 'idPoule', None)
-        if not poule_id_obj: return []
-
-        poule_id = poule_id_obj.id if hasattr(poule_id_obj, 'id') else str(poule_id_obj)
-
-        if poule_id in POULE_CACHE:
-            return POULE_CACHE[poule_id]
-
-        poule_data = ffbb_client.get_poule(poule_id)
-        matches = []
-        if poule_data and poule_data.rencontres:
-            matches = poule_data.rencontres
-            POULE_CACHE[poule_id] = matches
-        return matches
-
-    # Use ThreadPool to fetch poules faster
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(fetch_poule_matches, eng): eng for eng in org.engagements}
-        for future in as_completed(futures):
-            matches = future.result()
-            for m in matches:
-                # m is RencontresHit or dict?
-                # It's from GetPouleResponse, so it's a model object.
-                # Access fields directly
-                d = getattr(m, 'date_rencontre', '')
-                if d:
-                    # Check if d is datetime or string
-                    if isinstance(d, datetime):
-                        date_str = d.strftime("%Y-%m-%d")
-                    else:
-                        date_str = str(d).split("T")[0]
-
-                    if date_str not in ffbb_matches_by_date:
-                        ffbb_matches_by_date[date_str] = []
-                    ffbb_matches_by_date[date_str].append(m)
-
-    print(f"Indexed {sum(len(v) for v in ffbb_matches_by_date.values())} matches from FFBB.")
-
-    # Process Firestore Docs
-    updated_count = 0
-    skipped_count = 0
-
-    for doc in docs:
-        data = doc.to_dict()
-        match_id = doc.id
-        location = data.get("location", "").strip()
-        team_name = data.get("team", "") # e.g. "U18 M1" or "SCBA U18"
-        opponent_name = data.get("opponent", "")
-        match_date = data.get("dateISO", "") # e.g. "2024-11-23"
-
-        # Check if update is needed
-        is_incomplete = len(location) < 15 or not any(char.isdigit() for char in location)
-
-        new_location = None
-        source = ""
-
-        # Strategy 1: Known Venues
-        for key, val in KNOWN_VENUES.items():
-            if key.lower() in location.lower():
-                new_location = val
-                source = "Known Venue Map"
-                break
-
-        # Strategy 2: FFBB Match Lookup
-        if not new_location and is_incomplete:
-            # Look for match in ffbb_matches_by_date
-            candidates = ffbb_matches_by_date.get(match_date, [])
-
-            # Filter by Opponent Name (fuzzy match)
-            # Firestore: "CLERMONT BASKET" vs FFBB: "CLERMONT BASKET - 2"
-
-            best_match = None
-
-            for m in candidates:
-                # m properties: nomEquipe1, nomEquipe2
-                n1 = normalize_team_name(m.nomEquipe1)
-                n2 = normalize_team_name(m.nomEquipe2)
-
-                opp_norm = normalize_team_name(opponent_name)
-
-                # Check if opponent is in n1 or n2
-                # Also check if Club ("Stade Clermontois") is in the OTHER team roughly
-                # Or just opponent match is enough if unique on that date.
-
-                if (opp_norm in n1) or (opp_norm in n2):
-                    best_match = m
-                    break
-
-            if best_match:
-                # Fetch details
-                # best_match.id
-                addr = get_match_details_address(best_match.id, ffbb_client)
-                if addr:
-                    new_location = addr
-                    source = f"FFBB Match ID {best_match.id}"
-
-        # Strategy 3: FFBB Search (Fallback)
-        if not new_location and is_incomplete and location:
-             # Try simple search
-             try:
-                res = ffbb_client.search_salles(location)
-                if res and res.hits:
-                    top = res.hits[0]
-                    # Logic to extract address from top hit...
-                    # (Simplified from previous attempts)
-                    carto = getattr(top, 'cartographie', None)
-                    if carto and isinstance(carto, dict):
-                         new_location = f"{top.libelle}, {carto.get('adresse')}, {carto.get('code_postal')} {carto.get('ville')}"
-                         source = f"FFBB Search ({location})"
-             except:
-                 pass
-
-        if new_location and new_location != location:
-            print(f"[{match_id}] UPDATE FOUND:")
-            print(f"    Date   : {match_date}")
-            print(f"    Match  : {team_name} vs {opponent_name}")
-            print(f"    Current: {location}")
-            print(f"    New    : {new_location}")
-            print(f"    Source : {source}")
-
-            if not dry_run:
-                matches_ref.document(match_id).update({"location": new_location})
-                print(f"    -> APPLIED")
-            updated_count += 1
-        else:
-            if is_incomplete:
-                print(f"[{match_id}] SKIPPED (Incomplete):")
-                print(f"    Date   : {match_date}")
-                print(f"    Match  : {team_name} vs {opponent_name}")
-                print(f"    Current: {location}")
-                # Debug candidate matches
-                candidates = ffbb_matches_by_date.get(match_date, [])
-                if candidates:
-                    print(f"    FFBB Candidates on {match_date}: {len(candidates)}")
-                    for c in candidates:
-                        print(f"      - {c.nomEquipe1} vs {c.nomEquipe2} (ID: {c.id})")
-                else:
-                    print(f"    No FFBB candidates found for date {match_date}")
-            skipped_count += 1
-
-    print("\n--- SUMMARY ---")
-    print(f"Updated:   {updated_count}")
-    print(f"Skipped:   {skipped_count}")
+def fix_address(db, ffbb_client, dry_run=True, **options):
+    # options: see sync.run_sync
+    return run_sync(db, ffbb_client, [AddressReconciler(ffbb_client)], apply=not dry_run, checkpoint_name="fix_matches_addresses", **options)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Fix match addresses in Firestore.")
+    parser = argparse.ArgumentParser(description="Fix match addresses in Firestore (same as: sync.py run --only address).")
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without applying them.")
     parser.add_argument("--no-dry-run", action="store_false", dest="dry_run", help="Apply changes permanently.")
+    add_sync_arguments(parser)
     parser.set_defaults(dry_run=True)
 
     args = parser.parse_args()
 
     db = init_firebase()
-    client = init_ffbb()
+    client = init_ffbb_from_args(args)
 
-    fix_address(db, client, dry_run=args.dry_run)
+    fix_address(db, client, dry_run=args.dry_run, **sync_options(args))
@@ -1,11 +1,10 @@
 
-from ffbb_data_client import FFBBDataClient, TokenManager
+from shared import FFBBSession
 import sys
 
 def inspect_engagements():
     try:
-        tokens = TokenManager.get_tokens(use_cache=False)
-        client = FFBBDataClient.create(api_bearer_token=tokens.api_token, meilisearch_bearer_token=tokens.meilisearch_token)
+        client = FFBBSession()
 
         # SCBA
         org = client.get_organisme(9326)
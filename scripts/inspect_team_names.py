@@ -1,20 +1,20 @@
+from shared import add_date_arguments, init_firebase, query_matches
+from snapshot import add_snapshot_arguments, open_snapshot
+import argparse
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-import sys
-import os
+parser = argparse.ArgumentParser(description="List distinct team names stored in Firestore.")
+add_date_arguments(parser)
+add_snapshot_arguments(parser)
+args = parser.parse_args()
 
-def init_firebase():
-    try:
-        key_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', 'serviceAccountKey.json')
-        cred = credentials.Certificate(key_path)
-        firebase_admin.initialize_app(cred)
-    except Exception as e:
-        pass # Likely already init
-    return firestore.client()
-
-db = init_firebase()
-docs = db.collection("matches").stream()
+if args.local:
+    snapshot = open_snapshot(args.snapshot)
+    if snapshot is None:
+        raise SystemExit(1)
+    docs = snapshot.query(args.date_from, args.date_to, fields=["team"])
+else:
+    db = init_firebase()
+    docs = query_matches(db, args.date_from, args.date_to, fields=["team"])
 
 teams = set()
 for doc in docs:
@@ -1,13 +1,31 @@
 """
 Shared utilities for scripts.
-Common Firebase/FFBB initialization and team name parsing functions.
+Common Firebase/FFBB initialization, team name parsing and the FFBB match index.
 """
 import firebase_admin
 from firebase_admin import credentials, firestore
 from ffbb_data_client import FFBBDataClient, TokenManager
+import argparse
+import base64
+import cProfile
+import io
+import json
+import multiprocessing
+import pstats
 import sys
 import os
 import re
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
 # Map Team Name (in Firestore) -> FFBB Club ID
 CLUB_MAPPING = {
@@ -16,95 +34,1447 @@ CLUB_MAPPING = {
     "STADE CLERMONTOIS BASKET AUVERGNE": 9326,
 }
 
+# FFBB clubs whose engagements the sync indexes by default (ours, then partner clubs)
+DEFAULT_CLUB_IDS = [9326]
+
+CACHE_PATH = os.environ.get('FFBB_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'ffbb.sqlite'))
+CHECKPOINT_DIR = os.path.dirname(CACHE_PATH)
+
+# Seconds a cached FFBB response stays fresh, per endpoint
+CACHE_TTL = {
+    "organisme": 24 * 3600,
+    "poule": 24 * 3600,
+    "poule_matchday": 15 * 60, # poule with a game within MATCHDAY_WINDOW_DAYS
+    "rencontre": 6 * 3600,
+    "salle": 30 * 24 * 3600,
+    "search_salles": 7 * 24 * 3600,
+}
+MATCHDAY_WINDOW_DAYS = 2
+
+# FFBB fetch pipeline defaults
+FETCH_CONCURRENCY = 8
+FETCH_RATE = 10.0 # requests per second
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5 # seconds, doubled on each retry
+
+# Match fields the sync scripts read; roles and carpool are never needed
+MATCH_FIELDS = ["team", "opponent", "dateISO", "time", "location", "isHome"]
+
+# Process-pool matching (--workers)
+MATCH_SHARDS_PER_WORKER = 4 # several date shards per worker even out uneven dates
+MATCH_POOL_MIN_DOCS = 200 # below this, matching in-process beats the round trip
+
+# Roles created for home games, as in DEFAULT_ROLES (src/constants.ts): (name, capacity),
+# capacity 0 = unlimited. Senior men's games have no Goûter (buildDefaultRoles in useGames.ts)
+DEFAULT_ROLES = [("Buvette", 2), ("Chrono", 1), ("Table de marque", 1), ("Goûter", 0)]
+NO_GOUTER_TEAMS = {"SENIOR M1", "SENIOR M2"}
+
+# Firestore caps a WriteBatch at 500 operations
+WRITE_BATCH_SIZE = 500
+WRITE_RETRIES = 3
+
+# FFBB token lifetime: tokens are cached on disk until `exp` (or the default
+# TTL when they carry none) and refreshed REFRESH_MARGIN before that
+TOKEN_PATH = os.path.join(CHECKPOINT_DIR, 'ffbb-tokens.json')
+TOKEN_DEFAULT_TTL = 6 * 3600
+TOKEN_REFRESH_MARGIN = 10 * 60
+
+# Prefix of every metric written by Metrics.write_prometheus
+METRICS_PREFIX = "scba_sync"
+
+# --profile report sizes
+PROFILE_TOP_N = 30
+PROFILE_TRACE_FRAMES = 10
+
 def init_firebase():
     try:
-        key_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', 'serviceAccountKey.json')
-        cred = credentials.Certificate(key_path)
-        firebase_admin.initialize_app(cred)
-        print(f"Initialized Firebase with {key_path}.")
+        if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+            # The emulator needs no credentials, only a project id
+            project_id = os.environ.get('GCLOUD_PROJECT', 'demo-scba')
+            firebase_admin.initialize_app(options={'projectId': project_id})
+            print(f"Initialized Firebase against the emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}.")
+        else:
+            key_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', 'serviceAccountKey.json')
+            cred = credentials.Certificate(key_path)
+            firebase_admin.initialize_app(cred)
+            print(f"Initialized Firebase with {key_path}.")
     except Exception as e:
         print(f"Failed to init Firebase: {e}")
         sys.exit(1)
     return firestore.client()
 
-def init_ffbb():
+def init_ffbb(offline=False, use_cache=True, concurrency=FETCH_CONCURRENCY, rate=FETCH_RATE, retries=FETCH_RETRIES):
+    cache = FFBBCache() if use_cache or offline else None
+    if offline:
+        print(f"Offline mode: serving FFBB data from {cache.path}.")
+        return CachedFFBBClient(None, cache, offline=True)
     try:
-        tokens = TokenManager.get_tokens(use_cache=False)
-        client = FFBBDataClient.create(api_bearer_token=tokens.api_token, meilisearch_bearer_token=tokens.meilisearch_token)
+        with METRICS.span("ffbb_token"):
+            client = FFBBSession()
+            client.start_refresher()
         print("Initialized FFBB Client.")
-        return client
     except Exception as e:
         print(f"Failed to init FFBB Client: {e}")
         sys.exit(1)
+    fetcher = FFBBFetcher(client, concurrency=concurrency, rate=rate, retries=retries)
+    return CachedFFBBClient(fetcher, cache) if cache else fetcher
 
-def normalize_team_name(name):
-    return name.lower().replace("-", " ").replace(" ", "")
+def add_fetch_arguments(parser):
+    parser.add_argument("--offline", action="store_true", help="Use only the local FFBB cache, no API calls.")
+    parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY, help="Max parallel FFBB requests.")
+    parser.add_argument("--rate", type=float, default=FETCH_RATE, help="Max FFBB requests per second.")
+    parser.add_argument("--retries", type=int, default=FETCH_RETRIES, help="Retries per failed FFBB request.")
 
-def extract_team_number_local(team_str):
-    ts = team_str.upper().strip()
+def init_ffbb_from_args(args):
+    return init_ffbb(offline=args.offline, concurrency=args.concurrency, rate=args.rate, retries=args.retries)
 
-    # 1. Compact formats: U13M1, U15F2, SM1, SF2 (Letter(s) + OptionGender + Digit)
-    # UxxM1
-    m = re.search(r'U\d+[MF]\s*(\d+)', ts)
-    if m: return m.group(1)
+def iso_date(value):
+    # argparse type for YYYY-MM-DD options
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
 
-    # SM1, SF2
-    m = re.search(r'S[MF]\s*(\d+)', ts)
-    if m: return m.group(1)
+def add_date_arguments(parser):
+    parser.add_argument("--from", dest="date_from", type=iso_date, default=datetime.now().strftime("%Y-%m-%d"),
+                        help="First match date to check (YYYY-MM-DD, default: today).")
+    parser.add_argument("--to", dest="date_to", type=iso_date, default=None, help="Last match date to check (YYYY-MM-DD).")
+    parser.add_argument("--all-dates", action="store_const", const=None, dest="date_from",
+                        help="Check every stored match, past ones included.")
 
-    # 2. Spaced formats: "SENIOR M1", "U13 M1", "U15 F 2"
-    m = re.search(r'(?:SENIOR|U\d+)\s*[MF]?\s*(\d+)', ts)
-    if m: return m.group(1)
+def query_matches(db, date_from=None, date_to=None, fields=MATCH_FIELDS, ordered=False):
+    """
+    Streams match documents in a dateISO window (served by the dateISO index)
+    with only `fields` fetched. Windowed or `ordered` queries come in dateISO
+    order, which leaves out documents without a dateISO.
+    """
+    query = db.collection("matches")
+    if date_from:
+        query = query.where("dateISO", ">=", date_from)
+    if date_to:
+        query = query.where("dateISO", "<=", date_to)
+    if date_from or date_to or ordered:
+        query = query.order_by("dateISO")
+    if fields:
+        query = query.select(fields)
+    return query.stream()
 
-    # 3. Digit at very end (fallback)
-    # e.g. "Clermont 2"
-    m = re.search(r'\s(\d+)$', ts)
-    if m: return m.group(1)
+def normalize_team_name(name):
+    return name.lower().replace("-", " ").replace(" ", "")
 
-    # 4. " 1" inside string (last resort)
-    if " 1" in ts: return "1"
+class TeamKey(NamedTuple):
+    category: Optional[str] # "U13", "SE" or None
+    gender: Optional[str] # 'M', 'F' or None
+    number: str # team number, "1" by default
 
-    return "1" # Default
+# Team number rules, first match wins
+TEAM_NUMBER_RULES = [
+    re.compile(r'U\d+[MF]\s*(\d+)'), # Compact: U13M1, U15F2
+    re.compile(r'S[MF]\s*(\d+)'), # Compact: SM1, SF2
+    re.compile(r'(?:SENIOR|U\d+)\s*[MF]?\s*(\d+)'), # Spaced: "SENIOR M1", "U13 M1", "U15 F 2"
+    re.compile(r'\s(\d+)$'), # Digit at very end (fallback), e.g. "Clermont 2"
+]
 
-def extract_team_number_ffbb(team_name):
-    if clean_match := re.search(r' - (\d+)$', team_name):
-        return clean_match.group(1)
-    if clean_match := re.search(r' (\d+)$', team_name):
-        return clean_match.group(1)
-    return "1"
+SENIOR_MARKERS = ("SM", "SF", "SENIOR", "RM2", "RM3", "PNM")
+CATEGORY_PATTERN = re.compile(r'(U\d+)') # Generic Uxx (U7 to U20+)
 
-def extract_category_local(team_str):
+# Gender rules, first match wins
+GENDER_PATTERN_RULES = [
+    (re.compile(r'U\d+M\d*'), 'M'), # Compact: U13M1 -> M
+    (re.compile(r'U\d+F\d*'), 'F'),
+    (re.compile(r'SM\d*'), 'M'),
+    (re.compile(r'SF\d*'), 'F'),
+    (re.compile(r'[ -](M)\d+'), 'M'), # Explicit: "U13 M1", "U18-M1"
+    (re.compile(r'[ -](F)\d+'), 'F'),
+]
+GENDER_KEYWORD_RULES = [
+    ((" MASC", " M "), " M", 'M'), # (substrings, suffix, gender)
+    ((" FEM", " F "), " F", 'F'),
+    (("SENIOR M",), None, 'M'),
+    (("SENIOR F",), None, 'F'),
+]
+
+FFBB_TEAM_NUMBER_PATTERN = re.compile(r' (?:- )?(\d+)$')
+
+@lru_cache(maxsize=1024)
+def parse_team_key(team_str):
+    """
+    Parses a local team name ("U13 M1", "U15F2", "SENIOR M1") into a TeamKey.
+    """
     ts = team_str.upper()
-    # Handle SM/SF/SENIOR
-    if "SM" in ts or "SF" in ts or "SENIOR" in ts or "RM2" in ts or "RM3" in ts or "PNM" in ts:
+    return TeamKey(_parse_category(ts), _parse_gender(ts), _parse_number(ts.strip()))
+
+def _parse_number(ts):
+    for pattern in TEAM_NUMBER_RULES:
+        if m := pattern.search(ts):
+            return m.group(1)
+    return "1" # Default, also covers " 1" inside the string
+
+def _parse_category(ts):
+    if any(marker in ts for marker in SENIOR_MARKERS):
         return "SE"
+    if m := CATEGORY_PATTERN.search(ts):
+        return m.group(1)
+    return None
 
-    # Generic Uxx extraction (U7 to U20+)
-    match = re.search(r'(U\d+)', ts)
-    if match:
-        return match.group(1)
+def _parse_gender(ts):
+    for pattern, gender in GENDER_PATTERN_RULES:
+        if pattern.search(ts):
+            return gender
+    for substrings, suffix, gender in GENDER_KEYWORD_RULES:
+        if any(sub in ts for sub in substrings) or (suffix and ts.endswith(suffix)):
+            return gender
     return None
 
+def extract_team_number_local(team_str):
+    return parse_team_key(team_str).number
+
+def extract_category_local(team_str):
+    return parse_team_key(team_str).category
+
 def extract_gender_local(team_str):
     """
     Extracts gender 'M' or 'F' from local team name.
     """
-    ts = team_str.upper()
+    return parse_team_key(team_str).gender
+
+@lru_cache(maxsize=1024)
+def extract_team_number_ffbb(team_name):
+    if m := FFBB_TEAM_NUMBER_PATTERN.search(team_name):
+        return m.group(1)
+    return "1"
+
+def local_team_name(category, gender, number):
+    """
+    Team name the way the app stores it, from an FFBB category, gender and
+    team number: ("SE", "M", "1") -> "SENIOR M1", ("U13", "F", "2") -> "U13 F2".
+    Mixed competitions are named like the boys' teams.
+    """
+    prefix = "SENIOR" if category == "SE" else category
+    return f"{prefix} {'F' if gender == 'F' else 'M'}{number or 1}"
+
+def ffbb_club_name(team_name):
+    # "SC BILLOM - 2" -> "SC BILLOM"
+    return FFBB_TEAM_NUMBER_PATTERN.sub("", team_name).strip()
+
+# --- FFBB match index ---
+
+# Normalized fragment identifying our club in FFBB team names
+CLUB_NAME_KEY = "stadeclermontois"
+
+# FFBB club id -> normalized fragment identifying it in FFBB team names.
+# Clubs missing here are keyed from their organisme's name.
+CLUB_NAME_KEYS = {
+    9326: CLUB_NAME_KEY,
+}
+
+def club_name_key(club_id, org=None):
+    if club_id in CLUB_NAME_KEYS:
+        return CLUB_NAME_KEYS[club_id]
+    nom = getattr(org, 'nom', None)
+    return opponent_key(nom) if nom else None
+
+def club_rank(normalized_name, club_keys):
+    # Position in club_keys of the club a team name belongs to, None for other
+    # clubs. A None key (a club whose name is unknown) never matches.
+    for rank, key in enumerate(club_keys):
+        if key and key in normalized_name:
+            return rank
+    return None
+
+def club_ids_arg(value):
+    # "9326,1234" -> [9326, 1234]
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid club id list: {value}")
+
+def add_club_arguments(parser, note=""):
+    parser.add_argument("--clubs", type=club_ids_arg, default=DEFAULT_CLUB_IDS,
+                        help=f"Comma-separated FFBB club ids to index{note} (default: {','.join(map(str, DEFAULT_CLUB_IDS))}).")
+
+def ffbb_date_str(d):
+    if isinstance(d, datetime):
+        return d.strftime("%Y-%m-%d")
+    return str(d).split("T")[0]
+
+def ffbb_kickoff_time(d):
+    """
+    Returns the "HH:MM" kickoff of an FFBB date_rencontre (datetime or ISO string).
+    """
+    if isinstance(d, datetime):
+        return d.strftime("%H:%M")
+    if isinstance(d, str):
+        try:
+            return datetime.fromisoformat(d.replace("Z", "+00:00")).strftime("%H:%M")
+        except ValueError:
+            if "T" in d:
+                return d.split("T")[1][:5]
+    return None
 
-    # Compact: U13M1 -> M
-    if re.search(r'U\d+M\d*', ts): return 'M'
-    if re.search(r'U\d+F\d*', ts): return 'F'
-    if re.search(r'SM\d*', ts): return 'M'
-    if re.search(r'SF\d*', ts): return 'F'
+def opponent_key(name):
+    # "CLERMONT BASKET - 2" -> "clermontbasket"
+    return normalize_team_name(name).rstrip("0123456789")
 
-    # Explicit patterns
-    if re.search(r'[ -](M)\d+', ts): return 'M'
-    if re.search(r'[ -](F)\d+', ts): return 'F'
+# Opponent similarity (Dice coefficient over character trigrams)
+MATCH_MIN_SCORE = 0.6
+AMBIGUITY_MARGIN = 0.1 # candidates this close to the best score are equally plausible
 
-    # Keywords
-    if " MASC" in ts or " M " in ts or ts.endswith(" M"): return 'M'
-    if " FEM" in ts or " F " in ts or ts.endswith(" F"): return 'F'
-    if "SENIOR M" in ts: return 'M'
-    if "SENIOR F" in ts: return 'F'
+@lru_cache(maxsize=4096)
+def name_grams(key):
+    padded = f"#{key}#"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
 
+def name_similarity(a, b):
+    ga, gb = name_grams(a), name_grams(b)
+    if not ga or not gb:
+        return 0.0
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+def salle_id_of(value):
+    # FFBB returns the salle as a model, a dict or a bare id
+    if value is None or value == "":
+        return None
+    if isinstance(value, dict):
+        return value.get("id")
+    return getattr(value, 'id', value)
+
+def engagement_poule_id(engagement):
+    poule_id_obj = getattr(engagement, 'idPoule', None)
+    if not poule_id_obj:
+        return None
+    return poule_id_obj.id if hasattr(poule_id_obj, 'id') else str(poule_id_obj)
+
+def engagement_category_gender(engagement):
+    cat_code = "UNKNOWN"
+    gender_code = "X"
+    comp = getattr(engagement, 'idCompetition', None)
+    if comp is not None:
+        categorie = getattr(comp, 'categorie', None)
+        if categorie is not None and getattr(categorie, 'code', None):
+            cat_code = categorie.code
+        if getattr(comp, 'sexe', None):
+            gender_code = comp.sexe
+    return cat_code, gender_code
+
+@lru_cache(maxsize=None)
+def team_name_parts(name):
+    """
+    (name, normalized name, opponent key) of an FFBB team name, interned so the
+    many records of one team share their strings.
+    """
+    return sys.intern(name), sys.intern(normalize_team_name(name)), sys.intern(opponent_key(name))
+
+class MatchRecord:
+    """
+    Compact, slotted view of one FFBB rencontre keeping only what the matchers
+    and reconcilers read. Built from the rencontre model, which is then dropped.
+    """
+    __slots__ = (
+        "id", "date", "time", "nomEquipe1", "nomEquipe2", "n1", "n2", "category", "gender",
+        "salle_id", "club_rank", "involves_us", "is_home", "team_num", "opponent_keys",
+    )
+
+    def __init__(self, rencontre, cat_code, gender_code, club_keys=(CLUB_NAME_KEY,)):
+        self.id = rencontre.id
+        self.nomEquipe1, self.n1, key1 = team_name_parts(rencontre.nomEquipe1)
+        self.nomEquipe2, self.n2, key2 = team_name_parts(rencontre.nomEquipe2)
+        self.category = cat_code
+        self.gender = gender_code
+
+        d = getattr(rencontre, 'date_rencontre', '')
+        self.date = sys.intern(ffbb_date_str(d)) if d else ""
+        kickoff = ffbb_kickoff_time(d)
+        self.time = sys.intern(kickoff) if kickoff else kickoff
+        self.salle_id = salle_id_of(getattr(rencontre, 'salle', None))
+
+        # Our side is the one of the first club in club_keys, so against a
+        # partner club the match is seen from our primary club
+        rank1 = club_rank(self.n1, club_keys)
+        rank2 = club_rank(self.n2, club_keys)
+        is_n1_us = rank1 is not None and (rank2 is None or rank1 <= rank2)
+        is_n2_us = rank2 is not None and (rank1 is None or rank2 <= rank1)
+        self.club_rank = rank1 if is_n1_us else rank2
+        self.involves_us = is_n1_us or is_n2_us
+        self.is_home = is_n1_us
+        self.team_num = None
+        if is_n1_us:
+            self.team_num = extract_team_number_ffbb(self.nomEquipe1)
+        elif is_n2_us:
+            self.team_num = extract_team_number_ffbb(self.nomEquipe2)
+
+        if is_n1_us and not is_n2_us:
+            self.opponent_keys = (key2,)
+        elif is_n2_us and not is_n1_us:
+            self.opponent_keys = (key1,)
+        else:
+            self.opponent_keys = (key1, key2)
+
+    def opponent_matches(self, opp_norm):
+        return (opp_norm in self.n1) or (opp_norm in self.n2)
+
+    @property
+    def fingerprint(self):
+        return [self.date, self.time, str(self.salle_id) if self.salle_id is not None else None]
+
+    def opponent_score(self, opp_norm):
+        """
+        1.0 when the local opponent is contained in an FFBB team name, otherwise
+        the best trigram similarity against this match's opponent keys.
+        """
+        if opp_norm and self.opponent_matches(opp_norm):
+            return 1.0
+        key = opp_norm.rstrip("0123456789")
+        return max(name_similarity(key, k) for k in self.opponent_keys)
+
+    def fits(self, category=None, gender=None):
+        # Unknown local values don't filter, and mixed FFBB competitions fit either gender
+        if category and self.category and category != self.category:
+            return False
+        if gender == 'M' and self.gender == 'F': return False
+        if gender == 'F' and self.gender == 'M': return False
+        return True
+
+class FFBBMatchIndex:
+    """
+    Every rencontre of the poules our clubs are engaged in, fetched once and
+    indexed by date and by the opponent-name trigrams of each date, the only
+    lookups find_match makes.
+    """
+    def __init__(self, club_keys=(CLUB_NAME_KEY,)):
+        self.club_keys = tuple(club_keys) # team name fragments counted as "us", in club_ids order (None: unknown)
+        self.poules = {} # poule_id -> [rencontre id, ...]; the payloads themselves are not kept
+        self.by_id = {} # rencontre id -> MatchRecord
+        self.by_date = {} # "YYYY-MM-DD" -> [MatchRecord, ...]
+        self.grams_by_date = {} # date -> {trigram: [MatchRecord, ...]}
+        self.failed_poules = []
+
+    @classmethod
+    def build(cls, client, club_ids, max_workers=None):
+        """
+        Fetches the organismes of `club_ids` (one id or several) in parallel,
+        then every poule they are engaged in. A poule shared by several of
+        our clubs is fetched once. None when the first (primary) club can't
+        be fetched.
+        """
+        club_ids = [club_ids] if isinstance(club_ids, int) else list(dict.fromkeys(club_ids))
+        max_workers = max_workers or getattr(client, 'concurrency', 5)
+        print(f"Fetching engagements for Club ID{'s' if len(club_ids) > 1 else ''} {', '.join(map(str, club_ids))}...")
+
+        orgs = {}
+        with METRICS.span("get_organisme"):
+            for club_id, org, error in fetch_many(client.get_organisme, club_ids, max_workers):
+                if error is not None:
+                    print(f"Error fetching club {club_id}: {error}")
+                elif org and org.engagements:
+                    orgs[club_id] = org
+                else:
+                    print(f"Could not fetch engagements for club {club_id}.")
+        # Ranks are positions in club_ids, so a partner club that failed can't
+        # stand in for the primary one: without it, there is no index to build
+        club_keys = [club_name_key(club_id, orgs.get(club_id)) for club_id in club_ids]
+        if club_ids[0] not in orgs or club_keys[0] is None:
+            print(f"Could not fetch club engagements for the primary club {club_ids[0]}.")
+            return None
+
+        index = cls(club_keys)
+
+        # Engagements can share a poule, within a club or across clubs: fetch and index it once
+        poule_meta = {}
+        engagement_count = 0
+        for club_id in club_ids:
+            if club_id not in orgs:
+                continue
+            engagement_count += len(orgs[club_id].engagements)
+            for eng in orgs[club_id].engagements:
+                poule_id = engagement_poule_id(eng)
+                if poule_id and poule_id not in poule_meta:
+                    poule_meta[poule_id] = engagement_category_gender(eng)
+
+        print(f"Found {engagement_count} engagements ({len(poule_meta)} poules). Building Match Index from FFBB (this may take a moment)...")
+
+        with METRICS.span("poule_fanout"):
+            for poule_id, poule_data, error in fetch_many(client.get_poule, poule_meta, max_workers):
+                if error is not None:
+                    print(f"Error fetching poule {poule_id}: {error}")
+                    index.failed_poules.append(poule_id)
+                    continue
+                # Each poule is reduced to MatchRecords as it arrives and its payload released
+                matches = poule_data.rencontres if poule_data and poule_data.rencontres else []
+                cat_code, gender_code = poule_meta[poule_id]
+                index.poules[poule_id] = [entry.id for entry in (index.add(m, cat_code, gender_code) for m in matches) if entry]
+                del poule_data, matches
+        METRICS.incr("ffbb_rencontres_indexed", len(index))
+
+        print(f"Indexed {len(index)} matches from FFBB.")
+        if index.failed_poules:
+            print(f"WARNING: {len(index.failed_poules)} poules could not be fetched, their matches will show as not found.")
+        return index
+
+    def add(self, rencontre, cat_code, gender_code):
+        entry = MatchRecord(rencontre, cat_code, gender_code, self.club_keys)
+        if not entry.date:
+            return None
+        self.by_id[entry.id] = entry
+        self.by_date.setdefault(entry.date, []).append(entry)
+        grams = self.grams_by_date.setdefault(entry.date, {})
+        for gram in set().union(*(name_grams(k) for k in entry.opponent_keys)):
+            grams.setdefault(gram, []).append(entry)
+        return entry
+
+    def __len__(self):
+        return sum(len(v) for v in self.by_date.values())
+
+    def on_date(self, date):
+        return self.by_date.get(date, [])
+
+    def rank_opponent(self, date, opponent_name, min_score=MATCH_MIN_SCORE):
+        """
+        Matches on `date` whose opponent resembles `opponent_name`, as
+        [(score, MatchRecord), ...] best first. Only matches sharing a trigram
+        with the name are scored.
+        """
+        opp_norm = normalize_team_name(opponent_name)
+        grams = self.grams_by_date.get(date, {})
+        seen = {}
+        for gram in name_grams(opp_norm.rstrip("0123456789")):
+            for entry in grams.get(gram, ()):
+                seen[id(entry)] = entry
+        ranked = []
+        for entry in seen.values():
+            score = entry.opponent_score(opp_norm)
+            if score >= min_score:
+                ranked.append((score, entry))
+        ranked.sort(key=lambda item: -item[0])
+        return ranked
+
+    def subset(self, dates):
+        """
+        The index restricted to the matches on `dates`, sharing this index's
+        MatchRecords: what a MatchPool worker needs for a shard.
+        """
+        part = FFBBMatchIndex(self.club_keys)
+        for date in dates:
+            entries = self.by_date.get(date)
+            if not entries:
+                continue
+            part.by_date[date] = entries
+            part.grams_by_date[date] = self.grams_by_date[date]
+            for entry in entries:
+                part.by_id[entry.id] = entry
+        return part
+
+class MatchResult(NamedTuple):
+    best: Optional[MatchRecord] # None when nothing fits or the choice is ambiguous
+    ranked: list # [(score, MatchRecord), ...] that passed the filters, best first
+    ambiguous: bool
+
+class MatchDecision(NamedTuple):
+    entry: MatchRecord
+    score: float # opponent similarity
+    verdict: str # why find_match kept or dropped the entry
+
+def match_rejection(entry, team_key=None, is_home=None):
+    """
+    Why `entry` can't be the FFBB match of a doc with this team key and
+    home/away flag, or None when it can.
+    """
+    if team_key:
+        if not entry.fits(team_key.category, team_key.gender):
+            return f"category/gender {entry.category}/{entry.gender} vs local {team_key.category}/{team_key.gender}"
+        if entry.team_num and entry.team_num != team_key.number:
+            return f"our team number {entry.team_num} vs local {team_key.number}"
+    if is_home is not None and is_home != entry.is_home:
+        return f"{'home' if entry.is_home else 'away'} game vs local isHome={is_home}"
     return None
+
+def find_match(index, date, opponent_name, team_key=None, is_home=None, trace=None):
+    """
+    Picks the FFBB match for a Firestore doc. Candidates are ranked by opponent
+    similarity, then filtered on category, gender, our team number and
+    home/away, preferring games that involve our clubs, primary club first.
+    Two candidates within AMBIGUITY_MARGIN of the best score are reported as
+    ambiguous instead of taking the first one. With a `trace` list, a
+    MatchDecision is appended for every FFBB match of the day.
+    """
+    candidates = index.rank_opponent(date, opponent_name)
+    if trace is not None:
+        opp_norm = normalize_team_name(opponent_name)
+        scored = {id(entry) for _, entry in candidates}
+        for entry in index.on_date(date):
+            if id(entry) not in scored:
+                trace.append(MatchDecision(entry, entry.opponent_score(opp_norm), f"opponent score below {MATCH_MIN_SCORE}"))
+
+    ranked = []
+    for score, entry in candidates:
+        reason = match_rejection(entry, team_key, is_home)
+        if reason:
+            if trace is not None:
+                trace.append(MatchDecision(entry, score, reason))
+            continue
+        ranked.append((score, entry))
+
+    # A Firestore doc is always one of our games: games between two other
+    # clubs of the poule only count when none of ours fits, and partner clubs'
+    # games only when none of our primary club's fits
+    ours = [(score, entry) for score, entry in ranked if entry.involves_us]
+    if ours:
+        best_rank = min(entry.club_rank for score, entry in ours)
+        kept = [(score, entry) for score, entry in ours if entry.club_rank == best_rank]
+        if trace is not None:
+            for score, entry in ranked:
+                if not entry.involves_us:
+                    trace.append(MatchDecision(entry, score, "game between two other clubs, one of ours fits"))
+                elif entry.club_rank != best_rank:
+                    trace.append(MatchDecision(entry, score, "partner club game, one of the primary club's fits"))
+        ranked = kept
+
+    if not ranked:
+        return MatchResult(None, [], False)
+    top = ranked[0][0]
+    plausible = [entry for score, entry in ranked if top - score <= AMBIGUITY_MARGIN]
+    ambiguous = len(plausible) > 1
+    if trace is not None:
+        for score, entry in ranked:
+            if top - score > AMBIGUITY_MARGIN:
+                trace.append(MatchDecision(entry, score, f"score more than {AMBIGUITY_MARGIN} below the best"))
+            elif ambiguous:
+                trace.append(MatchDecision(entry, score, "AMBIGUOUS with another candidate"))
+            else:
+                trace.append(MatchDecision(entry, score, "SELECTED"))
+    if ambiguous:
+        return MatchResult(None, ranked, True)
+    return MatchResult(ranked[0][1], ranked, False)
+
+# --- Sharded matching ---
+
+def _match_shard(shard):
+    # (index subset, [(date, opponent, team, is_home), ...]) -> [(best id, [(score, id), ...], ambiguous), ...]
+    index, queries = shard
+    results = []
+    for date, opponent, team, is_home in queries:
+        result = find_match(index, date, opponent, parse_team_key(team), is_home)
+        results.append((result.best.id if result.best else None,
+                        [(score, entry.id) for score, entry in result.ranked], result.ambiguous))
+    return results
+
+def shard_by_date(queries, shard_count):
+    """
+    Splits query positions into about `shard_count` runs of whole dates with
+    similar numbers of queries, in date order.
+    """
+    by_date = {}
+    for position, query in enumerate(queries):
+        by_date.setdefault(query[0], []).append(position)
+    target = max(1, -(-len(queries) // shard_count))
+    shards, current = [], []
+    for date in sorted(by_date):
+        current.extend(by_date[date])
+        if len(current) >= target:
+            shards.append(current)
+            current = []
+    if current:
+        shards.append(current)
+    return shards
+
+class MatchPool:
+    """
+    find_match() over a pool of worker processes. Workers start from a fork
+    server (a fresh interpreter where there is none), never by forking this
+    process: by then it runs gRPC and background read threads, which a fork
+    does not survive safely. Queries are sharded by date and each shard is
+    sent with the index of its dates only (FFBBMatchIndex.subset), so every
+    date's matches are pickled once, whatever the number of workers. The
+    results come back as rencontre ids mapped onto this process's
+    MatchRecords in query order, so the outcome is the same as matching
+    in-process.
+    """
+    def __init__(self, index, workers):
+        methods = multiprocessing.get_all_start_methods()
+        if "forkserver" in methods:
+            context = multiprocessing.get_context("forkserver")
+            # Imported once by the fork server, not again by every worker
+            context.set_forkserver_preload(["__main__", "shared"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        self.index = index
+        self.workers = workers
+        self.pool = context.Pool(workers)
+
+    def match(self, queries):
+        """
+        [(date, opponent, team, is_home), ...] -> [MatchResult, ...]
+        """
+        if len(queries) < MATCH_POOL_MIN_DOCS:
+            return [find_match(self.index, date, opponent, parse_team_key(team), is_home)
+                    for date, opponent, team, is_home in queries]
+
+        shards = shard_by_date(queries, self.workers * MATCH_SHARDS_PER_WORKER)
+        by_id = self.index.by_id
+        results = [None] * len(queries)
+        payloads = []
+        for shard in shards:
+            shard_queries = [queries[p] for p in shard]
+            payloads.append((self.index.subset({query[0] for query in shard_queries}), shard_queries))
+        shard_results = self.pool.map(_match_shard, payloads, chunksize=1)
+        for shard, shard_result in zip(shards, shard_results):
+            for position, (best_id, ranked, ambiguous) in zip(shard, shard_result):
+                results[position] = MatchResult(by_id[best_id] if best_id is not None else None,
+                                                [(score, by_id[rid]) for score, rid in ranked], ambiguous)
+        METRICS.incr("match_shards", len(shards))
+        return results
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.pool.terminate()
+
+def print_ambiguous(result, indent="    "):
+    for score, entry in result.ranked:
+        print(f"{indent}- {entry.nomEquipe1} vs {entry.nomEquipe2} (ID: {entry.id}, score {score:.2f})")
+
+# --- Incremental checkpoint ---
+
+class Checkpoint:
+    """
+    Per-script record of the matches found in sync at the last successful run:
+    the Firestore update_time of each doc and the (date, time, salle)
+    fingerprint of the FFBB match it was reconciled against.
+    """
+    def __init__(self, name, directory=CHECKPOINT_DIR):
+        self.path = os.path.join(directory, f"checkpoint-{name}.json")
+        self.matches = {} # doc id -> {"update_time", "ffbb_id", "fingerprint"}
+        self.last_run = None
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.matches = data.get("matches", {})
+            self.last_run = data.get("last_run")
+
+    @staticmethod
+    def _update_time(doc):
+        value = getattr(doc, 'update_time', None)
+        return value.isoformat() if value is not None else None
+
+    def unchanged(self, doc, index):
+        """
+        True when neither the doc nor the FFBB match it was reconciled with
+        moved since the last run.
+        """
+        seen = self.matches.get(doc.id)
+        if not seen or seen["update_time"] is None or seen["update_time"] != self._update_time(doc):
+            return False
+        if seen["ffbb_id"] is None:
+            return True
+        entry = index.by_id.get(seen["ffbb_id"])
+        return entry is not None and entry.fingerprint == seen["fingerprint"]
+
+    def result(self, doc, index):
+        """
+        The MatchResult of a doc unchanged() since it was recorded, without
+        matching it again.
+        """
+        entry = index.by_id.get(self.matches[doc.id]["ffbb_id"])
+        return MatchResult(entry, [(1.0, entry)] if entry else [], False)
+
+    def record(self, doc, entry=None):
+        self.matches[doc.id] = {
+            "update_time": self._update_time(doc),
+            "ffbb_id": entry.id if entry else None,
+            "fingerprint": entry.fingerprint if entry else None,
+        }
+
+    def forget(self, doc):
+        self.matches.pop(doc.id, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"last_run": datetime.now().isoformat(timespec="seconds"), "matches": self.matches}, f)
+        os.replace(tmp_path, self.path)
+
+# --- FFBB tokens ---
+
+def token_expiry(token):
+    """
+    Expiry (epoch seconds) from a JWT's `exp` claim, None for opaque tokens.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def is_auth_error(error):
+    # 401/403 from the FFBB client, whatever exception class its version raises
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in (401, 403) or type(error).__name__ == "FFBBAuthenticationError"
+
+class SessionTokens(NamedTuple):
+    api_token: str
+    meilisearch_token: str
+    expires_at: float # epoch seconds
+
+class FFBBSession:
+    """
+    An FFBBDataClient whose tokens are managed for it: reused from a disk
+    cache across script runs while valid, refreshed by a background thread
+    before they expire, and renewed once, with the request retried, when the
+    API answers 401. Proxies every client method (get_poule, ...).
+    """
+    def __init__(self, path=TOKEN_PATH, default_ttl=TOKEN_DEFAULT_TTL, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self._tokens = None
+        self.refreshes = 0
+        self.client = None
+        if not self._load():
+            self.refresh()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        try:
+            tokens = SessionTokens(data["api_token"], data["meilisearch_token"], float(data["expires_at"]))
+        except (KeyError, TypeError, ValueError):
+            return False
+        if tokens.expires_at - self.refresh_margin <= time.time():
+            return False
+        self._use(tokens)
+        return True
+
+    def _use(self, tokens):
+        self.client = FFBBDataClient.create(api_bearer_token=tokens.api_token, meilisearch_bearer_token=tokens.meilisearch_token)
+        self._tokens = tokens
+
+    def tokens(self):
+        return self._tokens
+
+    @property
+    def expires_at(self):
+        return self._tokens.expires_at if self._tokens else 0
+
+    def refresh(self, stale_client=None):
+        """
+        Fetches new tokens and rebuilds the client. With `stale_client`, does
+        nothing if another thread already replaced that client.
+        """
+        with self._lock:
+            if stale_client is not None and self.client is not stale_client:
+                return
+            fetched = TokenManager.get_tokens(use_cache=False)
+            expires_at = token_expiry(fetched.api_token) or time.time() + self.default_ttl
+            tokens = SessionTokens(fetched.api_token, fetched.meilisearch_token, expires_at)
+            self._use(tokens)
+            self.refreshes += 1
+            METRICS.incr("ffbb_token_refreshes")
+            self._save(tokens)
+
+    def _save(self, tokens):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        # Bearer tokens: readable by this user only
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(tokens._asdict(), f)
+        os.replace(tmp_path, self.path)
+
+    def start_refresher(self):
+        """
+        Keeps the tokens fresh from a daemon thread for the rest of the run.
+        """
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="ffbb-token-refresh", daemon=True)
+            self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(max(1.0, self.expires_at - self.refresh_margin - time.time())):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"FFBB token refresh failed ({e}), retrying in a minute.")
+                self._stop.wait(60)
+
+    def call(self, method, *args, **kwargs):
+        client = self.client
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except Exception as e:
+            if not is_auth_error(e):
+                raise
+        METRICS.incr("ffbb_auth_retries")
+        self.refresh(stale_client=client)
+        return getattr(self.client, method)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        client = self.__dict__.get("client")
+        if name.startswith("_") or not callable(getattr(client, name, None)):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+# --- Persistent FFBB cache ---
+
+class OfflineCacheMiss(LookupError):
+    pass
+
+class FFBBCache:
+    """
+    File-backed store of FFBB responses keyed by (endpoint, id).
+    Payloads are pickled model objects, so a hit behaves exactly like a live call.
+    """
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL, payload BLOB NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+
+    def get(self, kind, key, allow_stale=False):
+        """
+        Returns (hit, value). Expired entries only count as hits with allow_stale.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, payload FROM responses WHERE kind = ? AND key = ?", (kind, str(key))
+            ).fetchone()
+        if row is None or (not allow_stale and row[0] < time.time()):
+            return False, None
+        METRICS.incr("ffbb_cache_read_bytes", len(row[1]), kind=kind)
+        return True, pickle.loads(row[1])
+
+    def put(self, kind, key, value, ttl):
+        now = time.time()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        # Pickled size of a fetched response, our closest measure of bytes transferred
+        METRICS.incr("ffbb_fetched_bytes", len(payload), kind=kind)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (kind, key, fetched_at, expires_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (kind, str(key), now, now + ttl, payload),
+            )
+            self._conn.commit()
+
+def poule_ttl(poule_data, today=None):
+    """
+    Poules with a game coming up soon get a short TTL so late time changes are seen.
+    """
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    horizon = (datetime.strptime(today, "%Y-%m-%d") + timedelta(days=MATCHDAY_WINDOW_DAYS)).strftime("%Y-%m-%d")
+    for m in getattr(poule_data, 'rencontres', None) or []:
+        d = getattr(m, 'date_rencontre', '')
+        if d and today <= ffbb_date_str(d) <= horizon:
+            return CACHE_TTL["poule_matchday"]
+    return CACHE_TTL["poule"]
+
+class CachedFFBBClient:
+    """
+    Wraps an FFBBDataClient with the persistent cache. In offline mode the
+    wrapped client is None and every lookup is served from the cache, stale or not.
+    """
+    def __init__(self, client, cache, offline=False):
+        self.client = client
+        self.cache = cache
+        self.offline = offline
+        self.concurrency = getattr(client, 'concurrency', FETCH_CONCURRENCY)
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind, key, fetch, ttl=None):
+        hit, value = self.cache.get(kind, key, allow_stale=self.offline)
+        if hit:
+            self.hits += 1
+            METRICS.incr("ffbb_cache_hits", kind=kind)
+            return value
+        self.misses += 1
+        METRICS.incr("ffbb_cache_misses", kind=kind)
+        if self.offline:
+            raise OfflineCacheMiss(f"{kind} {key} is not in the FFBB cache")
+        value = fetch()
+        if value is not None:
+            ttl = ttl(value) if callable(ttl) else (ttl or CACHE_TTL[kind])
+            self.cache.put(kind, key, value, ttl)
+        return value
+
+    def get_organisme(self, organisme_id):
+        return self._get("organisme", organisme_id, lambda: self.client.get_organisme(organisme_id))
+
+    def get_poule(self, poule_id):
+        return self._get("poule", poule_id, lambda: self.client.get_poule(poule_id), ttl=poule_ttl)
+
+    def get_rencontre(self, rencontre_id):
+        return self._get("rencontre", rencontre_id, lambda: self.client.get_rencontre(rencontre_id))
+
+    def get_salle(self, salle_id):
+        return self._get("salle", salle_id, lambda: self.client.get_salle(salle_id))
+
+    def search_salles(self, query):
+        return self._get("search_salles", query.lower(), lambda: self.client.search_salles(query))
+
+    def report(self):
+        total = self.hits + self.misses
+        if total:
+            print(f"FFBB cache: {self.hits}/{total} hits ({100 * self.hits / total:.0f}%).")
+        if hasattr(self.client, 'report'):
+            self.client.report()
+
+# --- FFBB fetch pipeline ---
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class FFBBFetcher:
+    """
+    Network side of the FFBB client: at most `concurrency` requests in flight,
+    `rate` requests per second, exponential-backoff retries, and concurrent
+    requests for the same id coalesced into one call.
+    """
+    def __init__(self, client, concurrency=FETCH_CONCURRENCY, rate=FETCH_RATE, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+        self.client = client
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._bucket = TokenBucket(rate) if rate else None
+        self._lock = threading.Lock()
+        self._inflight = {} # (kind, key) -> Future
+        self.latencies = {} # kind -> [seconds, ...]
+        self.errors = {} # kind -> count of failed attempts
+        self.coalesced = 0
+
+    def _call(self, kind, key, fetch):
+        with self._lock:
+            future = self._inflight.get((kind, key))
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[(kind, key)] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            METRICS.incr("ffbb_requests_coalesced", kind=kind)
+            return future.result()
+
+        try:
+            future.set_result(self._fetch_with_retries(kind, fetch))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[(kind, key)]
+        return future.result()
+
+    def _fetch_with_retries(self, kind, fetch):
+        for attempt in range(self.retries + 1):
+            if self._bucket:
+                self._bucket.acquire()
+            start = time.perf_counter()
+            try:
+                with self._slots:
+                    value = fetch()
+            except Exception:
+                self._record(kind, start, failed=True)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() / 2))
+                continue
+            self._record(kind, start)
+            return value
+
+    def _record(self, kind, start, failed=False):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(elapsed)
+            if failed:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+        METRICS.incr("ffbb_requests", kind=kind)
+        METRICS.incr("ffbb_request_seconds", elapsed, kind=kind)
+        if failed:
+            METRICS.incr("ffbb_request_errors", kind=kind)
+
+    def get_organisme(self, organisme_id):
+        return self._call("organisme", organisme_id, lambda: self.client.get_organisme(organisme_id))
+
+    def get_poule(self, poule_id):
+        return self._call("poule", poule_id, lambda: self.client.get_poule(poule_id))
+
+    def get_rencontre(self, rencontre_id):
+        return self._call("rencontre", rencontre_id, lambda: self.client.get_rencontre(rencontre_id))
+
+    def get_salle(self, salle_id):
+        return self._call("salle", salle_id, lambda: self.client.get_salle(salle_id))
+
+    def search_salles(self, query):
+        return self._call("search_salles", query, lambda: self.client.search_salles(query))
+
+    def report(self):
+        if not self.latencies:
+            return
+        print("FFBB requests:")
+        for kind, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            p50 = values[len(values) // 2]
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            print(f"    {kind:<14} n={len(values):<4} errors={self.errors.get(kind, 0):<3} "
+                  f"p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms max={values[-1] * 1000:.0f}ms")
+        if self.coalesced:
+            print(f"    {self.coalesced} duplicate requests coalesced.")
+
+def fetch_many(fetch, keys, max_workers=FETCH_CONCURRENCY):
+    """
+    Runs fetch(key) for every key on a thread pool and yields (key, result, error)
+    in completion order. Errors are returned, not raised, so one bad id doesn't
+    abort the batch.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, key): key for key in keys}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+# --- Batched Firestore writes ---
+
+class BatchWriter:
+    """
+    Collects document updates and sets and commits them as Firestore
+    WriteBatches of up to `flush_size` operations. A batch that keeps failing after `retries` is
+    replayed one document at a time so a single bad id doesn't sink the rest.
+    close() reports the committed and failed document ids, also kept in
+    `committed` and `failed`.
+    """
+    def __init__(self, db, collection="matches", flush_size=WRITE_BATCH_SIZE, retries=WRITE_RETRIES, backoff=FETCH_BACKOFF):
+        self.db = db
+        self.collection = db.collection(collection)
+        self.flush_size = min(flush_size, WRITE_BATCH_SIZE)
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = [] # [(doc_id, fields, op), ...], op: "update", "set" or "merge"
+        self.committed = []
+        self.failed = {} # doc_id -> error message
+
+    def update(self, doc_id, fields):
+        self._queue(doc_id, fields, "update")
+
+    def set(self, doc_id, data, merge=False):
+        # Creates or replaces the document, or with `merge` only writes these fields
+        self._queue(doc_id, data, "merge" if merge else "set")
+
+    def _queue(self, doc_id, fields, op):
+        self.pending.append((doc_id, fields, op))
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        ops, self.pending = self.pending, []
+        if not ops:
+            return
+        try:
+            self._commit(ops)
+            self.committed.extend(doc_id for doc_id, _, _ in ops)
+            return
+        except Exception as e:
+            print(f"Batch of {len(ops)} writes failed ({e}), retrying documents one by one...")
+        for doc_id, fields, op in ops:
+            try:
+                self._commit([(doc_id, fields, op)])
+                self.committed.append(doc_id)
+            except Exception as e:
+                self.failed[doc_id] = str(e)
+
+    def _commit(self, ops):
+        for attempt in range(self.retries + 1):
+            batch = self.db.batch()
+            for doc_id, fields, op in ops:
+                if op == "update":
+                    batch.update(self.collection.document(doc_id), fields)
+                else:
+                    batch.set(self.collection.document(doc_id), fields, merge=op == "merge")
+            try:
+                with METRICS.span("firestore_commit"):
+                    batch.commit()
+                METRICS.incr("firestore_docs_written", len(ops))
+                METRICS.incr("firestore_write_bytes", sum(approx_size(fields) for _, fields, _ in ops))
+                return
+            except Exception:
+                METRICS.incr("firestore_commit_errors")
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def close(self):
+        self.flush()
+        if self.committed or self.failed:
+            print(f"Writes committed: {len(self.committed)}, failed: {len(self.failed)}")
+            if self.committed:
+                print(f"    COMMITTED {', '.join(dict.fromkeys(self.committed))}")
+            for doc_id, error in sorted(self.failed.items()):
+                print(f"    FAILED {doc_id}: {error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# --- Instrumentation ---
+
+def approx_size(data):
+    # JSON size of a document or update, an estimate of its bytes on the wire
+    return len(json.dumps(data, default=str))
+
+class Metrics:
+    """
+    Wall time per stage (spans) and counters for one run, thread-safe.
+    Counters take labels: incr("ffbb_requests", kind="poule").
+    Written as a JSON line per run or as a Prometheus textfile.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.spans = {} # stage -> [count, total seconds, max seconds]
+            self.counters = {} # (name, ((label, value), ...)) -> value
+            self.memory = {} # stage -> {"rss_peak_kb": ..., "traced_peak_bytes": ...}, under profiling()
+            self._traced_peaks = [] # open spans' traced peaks, innermost last
+
+    @contextmanager
+    def span(self, name):
+        # Memory is attributed to the main thread's nested spans only
+        tracing = tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread()
+        if tracing:
+            self._open_traced_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self.spans.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+            if tracing and tracemalloc.is_tracing():
+                self._close_traced_peak(name)
+
+    def _open_traced_peak(self):
+        # tracemalloc has a single peak: fold it into the enclosing span before restarting it
+        if self._traced_peaks:
+            self._traced_peaks[-1] = max(self._traced_peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._traced_peaks.append(0)
+
+    def _close_traced_peak(self, name):
+        if not self._traced_peaks:
+            return
+        peak = max(self._traced_peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._traced_peaks:
+            self._traced_peaks[-1] = max(self._traced_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        with self._lock:
+            memory = self.memory.setdefault(name, {"rss_peak_kb": None, "traced_peak_bytes": 0})
+            memory["rss_peak_kb"] = peak_rss_kb()
+            memory["traced_peak_bytes"] = max(memory["traced_peak_bytes"], peak)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def total(self, name):
+        # Sum of a counter over all its labels
+        with self._lock:
+            return sum(value for (n, _), value in self.counters.items() if n == name)
+
+    def cache_hit_ratio(self):
+        hits, misses = self.total("ffbb_cache_hits"), self.total("ffbb_cache_misses")
+        return hits / (hits + misses) if hits + misses else None
+
+    def as_dict(self, **labels):
+        with self._lock:
+            spans = {name: {"count": c, "seconds": round(t, 6), "max_seconds": round(m, 6)}
+                     for name, (c, t, m) in sorted(self.spans.items())}
+            counters = {}
+            for (name, key_labels), value in sorted(self.counters.items()):
+                label_str = ",".join(f"{k}={v}" for k, v in key_labels)
+                counters[f"{name}{{{label_str}}}" if label_str else name] = round(value, 6)
+        return {"ts": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "wall_seconds": round(time.time() - self.started, 3),
+                **labels, "spans": spans, "counters": counters,
+                "ffbb_cache_hit_ratio": self.cache_hit_ratio(),
+                **({"memory": dict(self.memory)} if self.memory else {})}
+
+    def write_jsonl(self, path, **labels):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.as_dict(**labels)) + "\n")
+
+    def write_prometheus(self, path, **labels):
+        """
+        Writes a node_exporter textfile, replaced atomically so a scrape never
+        sees half a file.
+        """
+        def fmt(extra):
+            pairs = {**labels, **dict(extra)}
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+        lines = []
+        with self._lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        if spans:
+            lines.append(f"# TYPE {METRICS_PREFIX}_stage_seconds gauge")
+            lines += [f"{METRICS_PREFIX}_stage_seconds{fmt([('stage', name)])} {t:.6f}" for name, (c, t, m) in spans]
+            lines.append(f"# TYPE {METRICS_PREFIX}_stage_calls gauge")
+            lines += [f"{METRICS_PREFIX}_stage_calls{fmt([('stage', name)])} {c}" for name, (c, t, m) in spans]
+        typed = set()
+        for (name, key_labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+                typed.add(name)
+            lines.append(f"{METRICS_PREFIX}_{name}{fmt(key_labels)} {value:g}")
+        ratio = self.cache_hit_ratio()
+        if ratio is not None:
+            lines.append(f"# TYPE {METRICS_PREFIX}_ffbb_cache_hit_ratio gauge")
+            lines.append(f"{METRICS_PREFIX}_ffbb_cache_hit_ratio{fmt([])} {ratio:.4f}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_last_run_timestamp_seconds{fmt([])} {self.started:.0f}")
+
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+    def write(self, path, **labels):
+        # "*.prom" -> Prometheus textfile, anything else -> appended JSON line
+        if path.endswith(".prom"):
+            self.write_prometheus(path, **labels)
+        else:
+            self.write_jsonl(path, **labels)
+        print(f"Metrics written to {path}")
+
+    def report(self):
+        if not self.spans:
+            return
+        print("Stages:")
+        with self._lock:
+            spans = list(self.spans.items())
+        for name, (count, total, _) in spans:
+            line = f"    {name:<16} {total * 1000:>8.0f}ms" + (f" ({count} calls)" if count > 1 else "")
+            memory = self.memory.get(name)
+            if memory:
+                line += f"  traced peak {memory['traced_peak_bytes'] / 1e6:.1f}MB"
+                if memory["rss_peak_kb"]:
+                    line += f", RSS peak {memory['rss_peak_kb'] / 1024:.0f}MB"
+            print(line)
+
+METRICS = Metrics()
+
+# --- Profiling ---
+
+def peak_rss_kb():
+    # Peak resident set size of this process so far, None where unavailable
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # bytes on macOS, KB on Linux
+
+@contextmanager
+def profiling(directory, name, top_n=PROFILE_TOP_N):
+    """
+    Runs the block under cProfile and tracemalloc, and has every METRICS span
+    record its peak RSS and traced memory. Writes to `directory`:
+    <name>.pstats (open with `python -m pstats` or snakeviz), <name>-alloc.txt
+    (top allocation sites) and <name>-memory.json (memory per stage).
+    Does nothing when `directory` is empty.
+    """
+    if not directory:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, name)
+    tracemalloc.start(PROFILE_TRACE_FRAMES)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        profiler.dump_stats(base + ".pstats")
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top_n)
+
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        with open(base + "-alloc.txt", 'w', encoding='utf-8') as f:
+            f.write(f"Top {top_n} allocation sites still alive at the end of the run\n\n")
+            for stat in snapshot.statistics("lineno")[:top_n]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTop {top_n} allocation tracebacks\n")
+            for stat in snapshot.statistics("traceback")[:top_n]:
+                f.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+
+        with open(base + "-memory.json", 'w', encoding='utf-8') as f:
+            json.dump({"rss_peak_kb": peak_rss_kb(), "traced_peak_bytes": traced_peak,
+                       "stages": METRICS.memory}, f, indent=2)
+
+        print(f"\nProfile (top {top_n} by cumulative time):")
+        print(out.getvalue())
+        print(f"Profile written to {base}.pstats, {base}-alloc.txt and {base}-memory.json")
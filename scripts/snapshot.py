@@ -0,0 +1,226 @@
+"""
+Local SQLite mirror of the Firestore `matches` collection, flattened into
+matches, roles and carpool tables, so inspection and debugging don't read the
+whole collection every time. Refreshed incrementally from each document's
+update_time: only new or modified documents are fetched.
+
+Usage: python sync.py snapshot [--full]
+"""
+from shared import CHECKPOINT_DIR, METRICS, approx_size
+from datetime import datetime
+import json
+import os
+import sqlite3
+
+SNAPSHOT_PATH = os.path.join(CHECKPOINT_DIR, 'matches.sqlite')
+SNAPSHOT_GET_BATCH = 300 # documents per get_all round trip
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY,
+    update_time TEXT,
+    team TEXT,
+    opponent TEXT,
+    date TEXT,
+    date_iso TEXT,
+    time TEXT,
+    location TEXT,
+    is_home INTEGER,
+    competition TEXT,
+    team_logo TEXT,
+    opponent_logo TEXT
+);
+CREATE INDEX IF NOT EXISTS matches_date_iso ON matches (date_iso);
+CREATE INDEX IF NOT EXISTS matches_team ON matches (team);
+CREATE TABLE IF NOT EXISTS roles (
+    match_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role_id TEXT,
+    name TEXT,
+    capacity INTEGER,
+    volunteers TEXT, -- JSON array of names
+    PRIMARY KEY (match_id, position)
+);
+CREATE TABLE IF NOT EXISTS carpool (
+    match_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    entry_id TEXT,
+    name TEXT,
+    phone TEXT,
+    type TEXT,
+    seats INTEGER,
+    departure_location TEXT,
+    status TEXT,
+    matched_with TEXT, -- JSON array of entry ids
+    requested_driver_id TEXT,
+    PRIMARY KEY (match_id, position)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Firestore field -> matches column
+MATCH_COLUMNS = {
+    "team": "team", "opponent": "opponent", "date": "date", "dateISO": "date_iso", "time": "time",
+    "location": "location", "isHome": "is_home", "competition": "competition",
+    "teamLogo": "team_logo", "opponentLogo": "opponent_logo",
+}
+
+class LocalDoc:
+    """
+    A mirrored match, shaped like a Firestore snapshot (id, update_time, to_dict()).
+    """
+    def __init__(self, doc_id, update_time, data):
+        self.id = doc_id
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+class MatchSnapshot:
+    """
+    The SQLite mirror at `path`. refresh() brings it up to date with Firestore,
+    query() reads it the way shared.query_matches reads Firestore.
+    """
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        # Carpool rows hold phone numbers
+        os.chmod(path, 0o600)
+
+    def meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def refresh(self, db, full=False):
+        """
+        Lists the collection's ids and update_times (no field data), then
+        fetches only the documents that are new or changed since the last
+        refresh (every document with `full`) and drops the deleted ones.
+        Returns {"added", "updated", "deleted", "unchanged"} counts.
+        """
+        collection = db.collection("matches")
+        with METRICS.span("snapshot_list"):
+            listed = {doc.id: iso_time(doc.update_time) for doc in collection.select([]).stream()}
+        known = dict(self.conn.execute("SELECT id, update_time FROM matches"))
+        stale = [doc_id for doc_id, update_time in listed.items()
+                 if full or update_time is None or known.get(doc_id) != update_time]
+        deleted = [doc_id for doc_id in known if doc_id not in listed]
+        counts = {"added": 0, "updated": 0, "deleted": len(deleted), "unchanged": len(listed) - len(stale)}
+
+        with METRICS.span("snapshot_fetch"), self.conn:
+            for start in range(0, len(stale), SNAPSHOT_GET_BATCH):
+                refs = [collection.document(doc_id) for doc_id in stale[start:start + SNAPSHOT_GET_BATCH]]
+                for doc in db.get_all(refs):
+                    if not doc.exists:
+                        continue
+                    data = doc.to_dict()
+                    METRICS.incr("firestore_docs_read")
+                    METRICS.incr("firestore_read_bytes", approx_size(data))
+                    counts["updated" if doc.id in known else "added"] += 1
+                    self._store(doc.id, iso_time(doc.update_time), data)
+            for doc_id in deleted:
+                self._delete(doc_id)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_refresh', ?)",
+                              (datetime.now().isoformat(timespec="seconds"),))
+        return counts
+
+    def _delete(self, doc_id):
+        for table, key in (("matches", "id"), ("roles", "match_id"), ("carpool", "match_id")):
+            self.conn.execute(f"DELETE FROM {table} WHERE {key} = ?", (doc_id,))
+
+    def _store(self, doc_id, update_time, data):
+        self._delete(doc_id)
+        is_home = data.get("isHome")
+        self.conn.execute(
+            "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, update_time, data.get("team"), data.get("opponent"), data.get("date"), data.get("dateISO"),
+             data.get("time"), data.get("location"), None if is_home is None else int(bool(is_home)),
+             data.get("competition"), data.get("teamLogo"), data.get("opponentLogo")))
+        self.conn.executemany(
+            "INSERT INTO roles VALUES (?, ?, ?, ?, ?, ?)",
+            [(doc_id, position, role.get("id"), role.get("name"), role.get("capacity"),
+              json.dumps(role.get("volunteers") or [], ensure_ascii=False))
+             for position, role in enumerate(data.get("roles") or [])])
+        self.conn.executemany(
+            "INSERT INTO carpool VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(doc_id, position, entry.get("id"), entry.get("name"), entry.get("phone"), entry.get("type"),
+              entry.get("seats"), entry.get("departureLocation"), entry.get("status"),
+              json.dumps(entry.get("matchedWith")) if entry.get("matchedWith") is not None else None,
+              entry.get("requestedDriverId"))
+             for position, entry in enumerate(data.get("carpool") or [])])
+
+    def query(self, date_from=None, date_to=None, fields=None):
+        """
+        Mirrored matches in a dateISO window as LocalDocs, in dateISO order,
+        with only `fields` (all match fields plus roles and carpool when None).
+        Like query_matches, a window leaves out documents without a dateISO.
+        """
+        fields = list(fields) if fields is not None else list(MATCH_COLUMNS) + ["roles", "carpool"]
+        columns = [field for field in fields if field in MATCH_COLUMNS]
+        sql = "SELECT id, update_time" + "".join(f", {MATCH_COLUMNS[field]}" for field in columns) + " FROM matches"
+        where, params = [], []
+        if date_from:
+            where.append("date_iso >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("date_iso <= ?")
+            params.append(date_to)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date_iso, id"
+
+        for row in self.conn.execute(sql, params).fetchall():
+            data = {field: value for field, value in zip(columns, row[2:]) if value is not None}
+            if "isHome" in data:
+                data["isHome"] = bool(data["isHome"])
+            if "roles" in fields:
+                data["roles"] = self.roles(row[0])
+            if "carpool" in fields:
+                data["carpool"] = self.carpool(row[0])
+            yield LocalDoc(row[0], row[1], data)
+
+    def roles(self, match_id):
+        rows = self.conn.execute("SELECT role_id, name, capacity, volunteers FROM roles WHERE match_id = ? ORDER BY position",
+                                 (match_id,))
+        return [{"id": role_id, "name": name, "capacity": capacity, "volunteers": json.loads(volunteers)}
+                for role_id, name, capacity, volunteers in rows]
+
+    def carpool(self, match_id):
+        rows = self.conn.execute(
+            "SELECT entry_id, name, phone, type, seats, departure_location, status, matched_with, requested_driver_id"
+            " FROM carpool WHERE match_id = ? ORDER BY position", (match_id,))
+        entries = []
+        for entry_id, name, phone, kind, seats, departure, status, matched_with, requested in rows:
+            entry = {"id": entry_id, "name": name, "phone": phone, "type": kind, "seats": seats,
+                     "departureLocation": departure, "status": status,
+                     "matchedWith": json.loads(matched_with) if matched_with else None, "requestedDriverId": requested}
+            entries.append({key: value for key, value in entry.items() if value is not None})
+        return entries
+
+    def close(self):
+        self.conn.close()
+
+def iso_time(value):
+    return value.isoformat() if value is not None else None
+
+def add_snapshot_arguments(parser):
+    parser.add_argument("--local", action="store_true",
+                        help="Read matches from the local snapshot (python sync.py snapshot) instead of Firestore.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help=f"Local snapshot file (default: {SNAPSHOT_PATH}).")
+
+def open_snapshot(path=SNAPSHOT_PATH):
+    """
+    The MatchSnapshot at `path`, or None (with a hint) when none was taken yet.
+    """
+    if not os.path.exists(path):
+        print(f"No local snapshot at {path}. Create it with: python sync.py snapshot")
+        return None
+    snapshot = MatchSnapshot(path)
+    print(f"Reading {len(snapshot)} matches from the local snapshot (refreshed {snapshot.meta('last_refresh')}).")
+    return snapshot
@@ -0,0 +1,1460 @@
+"""
+Single entry point for match maintenance.
+Builds the FFBB index and reads Firestore once, runs every selected reconciler
+over the joined data and commits their corrections as one batched write set.
+
+Usage: python sync.py run [--only time,address,conflict] [--apply] [--report report.jsonl]
+       python sync.py run --apply-from report.jsonl [--apply]
+       python sync.py explain --date 2026-02-28 [--team "U11 M1"] [--opponent CLERMONT] [--local]
+       python sync.py import-season [--from 2025-09-01] [--apply]
+       python sync.py watch [--only time,address,conflict] [--apply]
+       python sync.py snapshot [--full]
+       python sync.py export [--format parquet|arrow]
+       python sync.py report unfilled|volunteers|carpool [--season 2025-2026]
+"""
+from shared import (
+    DEFAULT_CLUB_IDS, DEFAULT_ROLES, MATCH_FIELDS, MATCH_MIN_SCORE, NO_GOUTER_TEAMS, METRICS, WRITE_BATCH_SIZE, BatchWriter, Checkpoint, FFBBMatchIndex, MatchPool,
+    add_club_arguments, add_date_arguments, add_fetch_arguments, approx_size, fetch_many, ffbb_club_name, find_match,
+    init_firebase, init_ffbb_from_args, iso_date, local_team_name, normalize_team_name, parse_team_key, print_ambiguous,
+    profiling, query_matches
+)
+import analytics
+import argparse
+import csv
+from datetime import date
+import json
+import os
+import queue
+import threading
+import time
+from snapshot import SNAPSHOT_PATH, MatchSnapshot, add_snapshot_arguments, open_snapshot
+from venues import VenueGazetteer, name_tokens, salle_address
+
+def get_salle_address(salle_id, client, gazetteer):
+    if not salle_id:
+        return None
+    known = gazetteer.salle(salle_id)
+    if known:
+        return known["address"]
+
+    try:
+        salle = client.get_salle(str(salle_id))
+        if salle:
+            data = salle.model_dump() if hasattr(salle, 'model_dump') else vars(salle)
+            address = salle_address(data)
+            gazetteer.add_salle(salle_id, data.get("libelle") or data.get("nom"), address)
+            return address
+    except Exception as e:
+        print(f"Error fetching salle {salle_id}: {e}")
+    return None
+
+def get_match_details_address(match_id, client, gazetteer):
+    salle_id = gazetteer.rencontre_salle(match_id)
+    if salle_id is None:
+        try:
+            rencontre = client.get_rencontre(str(match_id))
+            if rencontre:
+                data = rencontre.model_dump() if hasattr(rencontre, 'model_dump') else vars(rencontre)
+                salle_id = data.get("salle")
+                if isinstance(salle_id, dict):
+                    salle_id = salle_id.get("id")
+                if salle_id:
+                    gazetteer.add_rencontre(match_id, salle_id)
+        except Exception as e:
+            print(f"Error fetching match {match_id}: {e}")
+    return get_salle_address(salle_id, client, gazetteer) if salle_id else None
+
+def is_incomplete_location(location):
+    return len(location) < 15 or not any(char.isdigit() for char in location)
+
+def normalize_local_time(local_time):
+    # "14h30" -> "14:30", "14:30:00" -> "14:30"
+    local_time_norm = local_time.lower().replace('h', ':').strip()
+    if len(local_time_norm) == 8:
+        local_time_norm = local_time_norm[:5]
+    return local_time_norm
+
+class SyncItem:
+    """
+    One Firestore match joined with its FFBB match result, found in the index
+    unless already computed (`match`, e.g. by a MatchPool).
+    """
+    def __init__(self, doc, data, index, match=None):
+        self.doc = doc
+        self.id = doc.id
+        self.team = data.get("team", "")
+        self.opponent = data.get("opponent", "")
+        self.date = data.get("dateISO", "")
+        self.time = data.get("time", "").strip()
+        self.location = data.get("location", "").strip()
+        self.is_home = data.get("isHome", None)
+        self.team_key = parse_team_key(self.team)
+        self.match = match or find_match(index, self.date, self.opponent, self.team_key, self.is_home)
+        self.unresolved = False # set by reconcilers that could not verify the doc
+        self.sources = {} # field -> where a reconciler's proposed value comes from
+        self.conflicts = [] # venue conflicts found by ConflictReconciler
+
+# --- Reconcilers ---
+
+class Reconciler:
+    """
+    A check run over every SyncItem. check() prints its findings and returns
+    the field updates to write, or None.
+    """
+    name = ""
+
+    def __init__(self, ffbb_client):
+        self.ffbb_client = ffbb_client
+
+    def prepare(self, items, index):
+        # Called with each batch of items before their check()
+        pass
+
+    def skip(self, items, index):
+        # Called with the items of a batch that --incremental skipped as
+        # unchanged, which are not check()ed
+        pass
+
+    def forget(self, doc_id):
+        # Called when a doc was deleted or lost its date
+        pass
+
+    def check(self, item):
+        raise NotImplementedError
+
+    def finish(self):
+        # Called once after the last check()
+        pass
+
+    def print_summary(self):
+        pass
+
+class TimeReconciler(Reconciler):
+    name = "time"
+
+    def __init__(self, ffbb_client):
+        super().__init__(ffbb_client)
+        self.ok = 0
+        self.discrepancies = 0
+        self.ambiguous = 0
+        self.skipped = 0
+
+    def check(self, item):
+        best_match = item.match.best
+        if best_match is None:
+            item.unresolved = True
+            if item.match.ambiguous:
+                print(f"[{item.id}] AMBIGUOUS:")
+                print(f"    Match   : {item.team} vs {item.opponent} ({item.date})")
+                print_ambiguous(item.match)
+                self.ambiguous += 1
+            else:
+                self.skipped += 1
+            return None
+
+        local_time_norm = normalize_local_time(item.time)
+        ffbb_time = best_match.time
+        if ffbb_time and ffbb_time != local_time_norm:
+            category, gender, team_num = item.team_key
+            print(f"[{item.id}] DISCREPANCY FOUND:")
+            print(f"    Match   : {item.team} vs {item.opponent} ({item.date})")
+            print(f"    Local   : {item.time} -> {local_time_norm}")
+            print(f"    Details : Home={item.is_home}, Cat={category}, Gender={gender}, Num={team_num}")
+            print(f"    FFBB    : {ffbb_time}")
+            self.discrepancies += 1
+            item.sources["time"] = f"FFBB Match ID {best_match.id}"
+            return {"time": ffbb_time}
+
+        self.ok += 1
+        return None
+
+    def print_summary(self):
+        print(f"OK:          {self.ok}")
+        print(f"Discrepancies: {self.discrepancies}")
+        print(f"Ambiguous:     {self.ambiguous}")
+        print(f"Skipped/Not Found: {self.skipped}")
+
+class AddressReconciler(Reconciler):
+    name = "address"
+
+    def __init__(self, ffbb_client, gazetteer=None):
+        super().__init__(ffbb_client)
+        self.gazetteer = gazetteer or VenueGazetteer()
+        self.updated = 0
+        self.skipped = 0
+
+    def prepare(self, items, index):
+        """
+        Fetches, concurrently, the salles the gazetteer doesn't know yet for
+        the items that will need one, so check() resolves from the gazetteer.
+        """
+        salle_ids, rencontre_ids = set(), set()
+        for item in items:
+            best = item.match.best
+            if not best or not is_incomplete_location(item.location) or self.gazetteer.match_known(item.location):
+                continue
+            if best.salle_id is not None:
+                if not self.gazetteer.salle(best.salle_id):
+                    salle_ids.add(best.salle_id)
+            elif self.gazetteer.rencontre_salle(best.id) is None:
+                rencontre_ids.add(best.id)
+
+        workers = getattr(self.ffbb_client, 'concurrency', 5)
+        if rencontre_ids:
+            print(f"Resolving {len(rencontre_ids)} match venues from FFBB...")
+            for _ in fetch_many(lambda rid: get_match_details_address(rid, self.ffbb_client, self.gazetteer), rencontre_ids, workers):
+                pass
+        if salle_ids:
+            print(f"Fetching {len(salle_ids)} new salles from FFBB...")
+            for _ in fetch_many(lambda sid: get_salle_address(sid, self.ffbb_client, self.gazetteer), salle_ids, workers):
+                pass
+        self.gazetteer.save()
+
+    def check(self, item):
+        location = item.location
+        is_incomplete = is_incomplete_location(location)
+        gazetteer = self.gazetteer
+
+        new_location = None
+        source = ""
+        strategy = None
+
+        # Strategy 1: Known Venues
+        hit = gazetteer.match_known(location)
+        if hit:
+            new_location, source = hit
+            strategy = "known_venue"
+
+        # Strategy 2: the FFBB match's salle (gazetteer, else FFBB)
+        best_match = item.match.best
+        if not new_location and is_incomplete and best_match:
+            if best_match.salle_id is not None:
+                addr = get_salle_address(best_match.salle_id, self.ffbb_client, gazetteer)
+            else:
+                addr = get_match_details_address(best_match.id, self.ffbb_client, gazetteer)
+            if addr:
+                new_location = addr
+                source = f"FFBB Match ID {best_match.id}"
+                strategy = "match_salle"
+
+        # Strategy 3: a salle named in the location, or the opponent's gym for away games
+        if not new_location and is_incomplete and location:
+            hit = gazetteer.match_salle(location)
+            if not hit and item.is_home is False and item.opponent:
+                hit = gazetteer.match_team(item.opponent)
+            if hit:
+                new_location, source = hit
+                strategy = "gazetteer_name"
+
+        # Strategy 4: FFBB Search (Fallback)
+        if not new_location and is_incomplete and location:
+            try:
+                res = self.ffbb_client.search_salles(location)
+                if res and res.hits:
+                    top = res.hits[0]
+                    carto = getattr(top, 'cartographie', None)
+                    if carto and isinstance(carto, dict):
+                        new_location = f"{top.libelle}, {carto.get('adresse')}, {carto.get('code_postal')} {carto.get('ville')}"
+                        source = f"FFBB Search ({location})"
+                        strategy = "search"
+                        if getattr(top, 'id', None):
+                            gazetteer.add_salle(top.id, top.libelle, new_location)
+            except Exception:
+                pass
+
+        if strategy:
+            METRICS.incr("venues_resolved", strategy=strategy)
+
+        if new_location and new_location != location:
+            print(f"[{item.id}] UPDATE FOUND:")
+            print(f"    Date   : {item.date}")
+            print(f"    Match  : {item.team} vs {item.opponent}")
+            print(f"    Current: {location}")
+            print(f"    New    : {new_location}")
+            print(f"    Source : {source}")
+            self.updated += 1
+            item.sources["location"] = source
+            return {"location": new_location}
+
+        self.skipped += 1
+        if is_incomplete:
+            item.unresolved = True
+            print(f"[{item.id}] SKIPPED (Incomplete):")
+            print(f"    Date   : {item.date}")
+            print(f"    Match  : {item.team} vs {item.opponent}")
+            print(f"    Current: {location}")
+            # Debug candidate matches
+            if item.match.ambiguous:
+                print(f"    Ambiguous FFBB matches on {item.date}:")
+                print_ambiguous(item.match, indent="      ")
+            elif item.match.ranked:
+                print(f"    FFBB Candidates on {item.date}: {len(item.match.ranked)}")
+                for _, c in item.match.ranked:
+                    print(f"      - {c.nomEquipe1} vs {c.nomEquipe2} (ID: {c.id})")
+            else:
+                print(f"    No FFBB candidates found for date {item.date}")
+        return None
+
+    def finish(self):
+        self.gazetteer.save()
+
+    def print_summary(self):
+        print(f"Updated:   {self.updated}")
+        print(f"Skipped:   {self.skipped}")
+        print(f"Gazetteer: {len(self.gazetteer.salles)} FFBB salles known")
+
+# Minutes a game holds the court from kickoff, warm-up of the next one excluded
+GAME_MINUTES = {"U7": 60, "U9": 60, "U11": 75, "U13": 90, "U15": 105, "U17": 120, "U18": 120, "U20": 120, "SE": 120}
+GAME_MINUTES_DEFAULT = 120
+MIN_TURNAROUND = 15 # minutes needed between two games in the same gym
+
+def kickoff_minutes(local_time):
+    # "14h30" -> 870, None when there is no usable time
+    parts = normalize_local_time(local_time or "").split(":")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        return None
+    return int(parts[0]) * 60 + int(parts[1])
+
+def clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class VenueSchedule:
+    """
+    Interval index of the games held in each gym: (venue, date) -> {game key:
+    (start, end, label)}, in minutes from midnight. place() moves a game that
+    was placed before, sweep() sorts one venue-day and walks it once.
+    """
+    def __init__(self):
+        self.slots = {}
+        self.placed = {} # game key -> (venue, date)
+
+    def place(self, key, venue, date, start, end, label):
+        self.remove(key)
+        self.slots.setdefault((venue, date), {})[key] = (start, end, label)
+        self.placed[key] = (venue, date)
+
+    def remove(self, key):
+        old = self.placed.pop(key, None)
+        if old:
+            self.slots[old].pop(key, None)
+
+    def sweep(self, venue_day, turnaround):
+        """
+        Yields (kind, earlier key, later key, minutes) for each game of
+        `venue_day` that starts before the latest end so far ("overlap", by
+        how long) or less than `turnaround` minutes after it ("turnaround",
+        the gap).
+        """
+        latest = None # (end, key) of the game ending last so far
+        for key, (start, end, _) in sorted(self.slots.get(venue_day, {}).items(), key=lambda slot: slot[1][:2]):
+            if latest is not None:
+                gap = start - latest[0]
+                if gap < 0:
+                    yield "overlap", latest[1], key, min(end, latest[0]) - start
+                elif gap < turnaround:
+                    yield "turnaround", latest[1], key, gap
+            if latest is None or end > latest[0]:
+                latest = (end, key)
+
+class ConflictReconciler(Reconciler):
+    """
+    Reports home games booked in the same gym at overlapping times, or with
+    less than `turnaround` minutes between them. A game lasts GAME_MINUTES of
+    its category (overridden by `game_minutes`). Two schedules are checked:
+    the Firestore docs, by location (or their FFBB salle when the location is
+    incomplete), and the FFBB games on the same dates, by salle id. Only
+    reports: check() never returns updates.
+
+    The Firestore schedule accumulates across batches, so in a watch a doc
+    is compared with every doc seen since it started. The docs an
+    --incremental run skips are placed too (see skip()), so it reports the
+    same conflicts as a full run.
+    """
+    name = "conflict"
+
+    def __init__(self, ffbb_client, gazetteer=None, game_minutes=None, turnaround=MIN_TURNAROUND):
+        super().__init__(ffbb_client)
+        self.gazetteer = gazetteer or VenueGazetteer()
+        self.game_minutes = dict(GAME_MINUTES, **(game_minutes or {}))
+        self.turnaround = turnaround
+        self.schedule = VenueSchedule() # Firestore docs
+        self.labels = {} # venue key -> printable venue
+        self.reported = set() # (source, kind, earlier key, later key)
+        self.counts = {"overlap": 0, "turnaround": 0}
+        self.ffbb_counts = {"overlap": 0, "turnaround": 0}
+        self.unplaced = 0
+
+    def duration(self, category):
+        return self.game_minutes.get(category, GAME_MINUTES_DEFAULT)
+
+    def salle_of(self, entry):
+        if entry is None:
+            return None
+        return entry.salle_id if entry.salle_id is not None else self.gazetteer.rencontre_salle(entry.id)
+
+    def venue_of(self, item):
+        """
+        (key, label) of the gym a doc's game is in, or None when unknown. A
+        location naming a known venue or fetched salle resolves to its
+        address, so spellings of one gym share a key.
+        """
+        text = item.location
+        hit = self.gazetteer.match_known(text) or self.gazetteer.match_salle(text)
+        if hit:
+            text = hit[0]
+        elif is_incomplete_location(text):
+            salle_id = self.salle_of(item.match.best)
+            salle = self.gazetteer.salle(salle_id)
+            if salle:
+                text = salle["address"]
+            elif salle_id is not None:
+                return f"salle:{salle_id}", f"FFBB salle {salle_id}"
+            else:
+                return None
+        return " ".join(name_tokens(text)), text
+
+    def prepare(self, items, index):
+        """
+        Places the batch's home docs in the Firestore schedule and sweeps the
+        venue-days they landed on, then sweeps the FFBB games of the batch's
+        dates. Each conflict is printed once and noted on the items involved.
+        """
+        by_id = {} # doc id -> [item]
+        touched = set()
+        for item in items:
+            by_id[item.id] = [item]
+            start = kickoff_minutes(item.time)
+            venue = self.venue_of(item) if item.is_home is True and start is not None else None
+            if venue is None:
+                self.unplaced += item.is_home is True
+                self.forget(item.id)
+                continue
+            key, self.labels[key] = venue
+            end = start + self.duration(item.team_key.category)
+            self.schedule.place(item.id, key, item.date, start, end, f"[{item.id}] {item.team} vs {item.opponent}")
+            touched.add((key, item.date))
+        for venue_day in sorted(touched):
+            self._report("Firestore", self.schedule, venue_day, by_id, self.counts)
+
+        ffbb = VenueSchedule()
+        ours = {} # FFBB id -> items matched to it
+        for item in items:
+            if item.match.best:
+                ours.setdefault(item.match.best.id, []).append(item)
+        home = set() # FFBB ids of our home games
+        ffbb_days = set()
+        for day in sorted({item.date for item in items}):
+            for entry in index.on_date(day):
+                start = kickoff_minutes(entry.time)
+                salle_id = self.salle_of(entry)
+                if start is None or salle_id is None:
+                    continue
+                key = f"salle:{salle_id}"
+                salle = self.gazetteer.salle(salle_id)
+                self.labels.setdefault(key, salle["address"] if salle else f"FFBB salle {salle_id}")
+                ffbb.place(entry.id, key, day, start, start + self.duration(entry.category),
+                           f"FFBB {entry.id}: {entry.nomEquipe1} vs {entry.nomEquipe2}")
+                if entry.involves_us and entry.is_home:
+                    home.add(entry.id)
+                    ffbb_days.add((key, day))
+        for venue_day in sorted(ffbb_days):
+            self._report("FFBB", ffbb, venue_day, ours, self.ffbb_counts, relevant=home)
+
+    def skip(self, items, index):
+        # Unchanged docs still hold their slot: place them like checked ones
+        self.prepare(items, index)
+
+    def forget(self, doc_id):
+        # Frees the doc's slot, and lets its conflicts be reported again if it comes back
+        if doc_id in self.schedule.placed:
+            self.schedule.remove(doc_id)
+            self.reported = {seen for seen in self.reported if seen[0] != "Firestore" or doc_id not in seen[2:]}
+
+    def _report(self, source, schedule, venue_day, items_of, counts, relevant=None):
+        # Prints the new conflicts of one venue-day (involving a `relevant` game
+        # when given) and notes them on the items of either game
+        venue, day = venue_day
+        slots = schedule.slots[venue_day]
+        for kind, earlier, later, minutes in schedule.sweep(venue_day, self.turnaround):
+            if relevant is not None and earlier not in relevant and later not in relevant:
+                continue
+            seen = (source, kind, earlier, later)
+            if seen in self.reported:
+                continue
+            self.reported.add(seen)
+            counts[kind] += 1
+            METRICS.incr("venue_conflicts", kind=kind, source=source.lower())
+            print(f"{source.upper()} {'OVERLAP' if kind == 'overlap' else 'TIGHT TURNAROUND'} ({day}, {self.labels[venue]}):")
+            for key in (earlier, later):
+                start, end, label = slots[key]
+                print(f"    {clock(start)}-{clock(end)} {label}")
+            print(f"    {'Overlap' if kind == 'overlap' else 'Gap'}: {minutes} min")
+            for own, other in ((earlier, later), (later, earlier)):
+                start, end, _ = slots[own]
+                for item in items_of.get(own, ()):
+                    item.conflicts.append({"kind": kind, "source": source, "slot": f"{clock(start)}-{clock(end)}",
+                                           "with": other, "with_label": slots[other][2], "minutes": minutes,
+                                           "venue": self.labels[venue]})
+
+    def check(self, item):
+        return None
+
+    def print_summary(self):
+        print(f"Overlaps:          {self.counts['overlap']} (FFBB: {self.ffbb_counts['overlap']})")
+        print(f"Tight turnarounds: {self.counts['turnaround']} (FFBB: {self.ffbb_counts['turnaround']})")
+        print(f"Home games without a venue or time: {self.unplaced}")
+
+RECONCILERS = {
+    "time": TimeReconciler,
+    "address": AddressReconciler,
+    "conflict": ConflictReconciler,
+}
+
+# --- Diff report ---
+
+REPORT_COLUMNS = ["id", "kind", "doc_id", "date", "team", "opponent", "field", "current", "proposed",
+                  "source", "ffbb_id", "candidates"]
+REPORT_KINDS = ("change", "ambiguous", "unmatched", "conflict")
+
+class DiffReport:
+    """
+    Streams the findings of a run to `path`, one row per finding, flushed as
+    it is found: JSON lines, or CSV when the path ends in .csv. A row is a
+    proposed field change, an ambiguous doc (with its FFBB candidates), a
+    doc with no FFBB match or a venue conflict (one row per game it clashes
+    with). Row ids ("<doc id>:<field or kind>[:<other game>]") are stable
+    across runs so two reports can be diffed, and change rows can be
+    replayed with --apply-from.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.csv_writer = None
+        if self.is_csv:
+            self.csv_writer = csv.DictWriter(self.file, REPORT_COLUMNS)
+            self.csv_writer.writeheader()
+        self.rows = 0
+
+    def write(self, kind, item, field=None, current=None, proposed=None, source=None, ffbb_id=None, candidates=None,
+              other=None):
+        row = {
+            "id": f"{item.id}:{field or kind}" + (f":{other}" if other else ""), "kind": kind, "doc_id": item.id, "date": item.date,
+            "team": item.team, "opponent": item.opponent, "field": field, "current": current,
+            "proposed": proposed, "source": source, "ffbb_id": ffbb_id, "candidates": candidates,
+        }
+        if self.is_csv:
+            row["candidates"] = json.dumps(candidates) if candidates else None
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.rows += 1
+
+    def add_item(self, item, updates):
+        """
+        Rows for one reconciled SyncItem and the merged updates proposed for it.
+        """
+        if item.match.ambiguous:
+            self.write("ambiguous", item, candidates=[{"ffbb_id": entry.id, "score": round(score, 3),
+                                                       "teams": f"{entry.nomEquipe1} vs {entry.nomEquipe2}"}
+                                                      for score, entry in item.match.ranked])
+        elif item.match.best is None:
+            self.write("unmatched", item)
+        best_id = item.match.best.id if item.match.best else None
+        for field, proposed in updates.items():
+            self.write("change", item, field=field, current=getattr(item, field, None), proposed=proposed,
+                       source=item.sources.get(field), ffbb_id=best_id)
+        for conflict in item.conflicts:
+            self.write("conflict", item, current=conflict["slot"], source=conflict["source"], ffbb_id=best_id,
+                       other=f"{conflict['source'].lower()}-{conflict['with']}", candidates=[conflict])
+
+    def close(self):
+        self.file.close()
+        print(f"Report: {self.rows} rows written to {self.path}")
+
+def read_report(path):
+    """
+    Rows of a DiffReport file (JSON lines or CSV), blank lines skipped.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith(".csv"):
+            return [row for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+def apply_report(db, path, apply=False, flush_size=WRITE_BATCH_SIZE):
+    """
+    Replays the change rows of a (reviewed) report as batched writes, without
+    fetching FFBB. A change whose field no longer holds the reported current
+    value in Firestore is skipped as stale, so edits made since the report
+    are not overwritten. Without `apply`, only prints what would be written.
+    """
+    changes = [row for row in read_report(path) if row.get("kind") == "change"]
+    print(f"\n--- {'APPLY' if apply else 'DRY RUN'} MODE (replaying {len(changes)} changes from {path}) ---\n")
+    if not changes:
+        return None
+
+    dates = sorted(row["date"] for row in changes if row.get("date"))
+    current = {} # doc id -> Firestore data now
+    if dates:
+        with METRICS.span("firestore_read"):
+            for doc, data in map(read_match, query_matches(db, dates[0], dates[-1])):
+                current[doc.id] = data
+
+    updates = {} # doc id -> fields, in report order
+    stale = 0
+    for row in changes:
+        data = current.get(row["doc_id"])
+        if data is None:
+            print(f"[{row['doc_id']}] SKIPPED: not found in Firestore on {row.get('date')}")
+            stale += 1
+            continue
+        now = (data.get(row["field"]) or "").strip()
+        if now != (row.get("current") or ""):
+            print(f"[{row['doc_id']}] STALE {row['field']}: report has {row.get('current')!r}, Firestore now {now!r}")
+            stale += 1
+            continue
+        print(f"[{row['doc_id']}] {row['field']}: {row.get('current')!r} -> {row['proposed']!r}")
+        updates.setdefault(row["doc_id"], {})[row["field"]] = row["proposed"]
+
+    writer = BatchWriter(db, flush_size=flush_size)
+    if apply:
+        for doc_id, fields in updates.items():
+            writer.update(doc_id, fields)
+        with METRICS.span("write"):
+            writer.close()
+
+    print("\n--- SUMMARY ---")
+    print(f"Documents to update: {len(updates)}")
+    print(f"Stale/missing:       {stale}")
+    return writer
+
+# --- Sync run ---
+
+def read_match(doc):
+    data = doc.to_dict()
+    METRICS.incr("firestore_docs_read")
+    METRICS.incr("firestore_read_bytes", approx_size(data))
+    return doc, data
+
+def read_in_background(db, date_from=None, date_to=None):
+    """
+    Starts streaming the Firestore matches, in dateISO order, on a background
+    thread so the read overlaps the FFBB fetch. Returns a generator of batches
+    of (doc, data): each batch holds every complete date that arrived since
+    the previous one, so a slow read yields small batches and a fast one a
+    single batch. Errors of the stream are raised by the generator.
+    """
+    arrived = queue.Queue()
+    done = object()
+
+    def reader():
+        try:
+            with METRICS.span("firestore_read"):
+                for doc in query_matches(db, date_from, date_to, ordered=True):
+                    arrived.put(read_match(doc))
+            arrived.put(done)
+        except Exception as e:
+            arrived.put(e)
+
+    threading.Thread(target=reader, name="firestore-read", daemon=True).start()
+
+    def batches():
+        pending = []
+        while True:
+            entries = [arrived.get()]
+            while not arrived.empty():
+                entries.append(arrived.get_nowait())
+            for entry in entries:
+                if entry is done:
+                    if pending:
+                        yield pending
+                    return
+                if isinstance(entry, Exception):
+                    raise entry
+                pending.append(entry)
+            # The last date may still be arriving: hold it back
+            last_date = pending[-1][1].get("dateISO")
+            cut = len(pending)
+            while cut and pending[cut - 1][1].get("dateISO") == last_date:
+                cut -= 1
+            if cut:
+                yield pending[:cut]
+                pending = pending[cut:]
+    return batches()
+
+def run_sync(db, ffbb_client, reconcilers, apply=False, flush_size=WRITE_BATCH_SIZE,
+             date_from=None, date_to=None, incremental=False, club_ids=None, metrics_path=None,
+             profile_dir=None, pipeline=False, workers=1, report_path=None, checkpoint_name=None):
+    """
+    Joins the Firestore matches in [date_from, date_to] with the FFBB index and
+    runs `reconcilers` over them. Corrections from every reconciler are merged
+    per document and written in one batched pass when `apply` is set.
+    `club_ids` defaults to DEFAULT_CLUB_IDS. The --incremental checkpoint
+    defaults to one per set of reconcilers ("sync-address+time"), so a doc
+    verified by some reconcilers is not skipped by others. Stage timings and counters go
+    to `metrics_path` when set (see Metrics.write), CPU and memory profiles
+    to `profile_dir` (see profiling).
+
+    With `pipeline`, Firestore is read on a background thread while the FFBB
+    index builds, and the docs are then reconciled in batches of dates as the
+    read completes them, so wall time tends to max(read, fetch).
+
+    With `workers` > 1, matching runs on that many processes sharing the
+    index (see MatchPool); reconcilers and writes stay in this process, in
+    document order, so the output is the same as with one worker.
+
+    With `report_path`, every finding is also streamed there as a DiffReport.
+    """
+    checkpoint_name = checkpoint_name or "sync-" + "+".join(sorted(r.name for r in reconcilers))
+    with profiling(profile_dir, checkpoint_name):
+        return _run_sync(db, ffbb_client, reconcilers, apply, flush_size, date_from, date_to,
+                         incremental, club_ids, metrics_path, pipeline, workers, report_path, checkpoint_name)
+
+def _run_sync(db, ffbb_client, reconcilers, apply, flush_size, date_from, date_to,
+              incremental, club_ids, metrics_path, pipeline, workers, report_path, checkpoint_name):
+    print(f"\n--- {'APPLY' if apply else 'DRY RUN'} MODE ({', '.join(r.name for r in reconcilers)}) ---\n")
+
+    if pipeline:
+        batches = read_in_background(db, date_from, date_to)
+    else:
+        with METRICS.span("firestore_read"):
+            batches = [[read_match(doc) for doc in query_matches(db, date_from, date_to)]]
+
+    with METRICS.span("index"):
+        index = FFBBMatchIndex.build(ffbb_client, club_ids or DEFAULT_CLUB_IDS)
+    if index is None:
+        return None
+
+    checkpoint = Checkpoint(checkpoint_name)
+    writer = BatchWriter(db, flush_size=flush_size)
+    unchanged_count = 0
+    pool = MatchPool(index, workers) if workers and workers > 1 else None
+    report = DiffReport(report_path) if report_path else None
+    try:
+        for batch in batches:
+            unchanged_count += reconcile_batch(batch, index, reconcilers, checkpoint, writer, apply, incremental, pool, report)
+    finally:
+        if pool:
+            pool.close()
+        if report:
+            report.close()
+
+    for reconciler in reconcilers:
+        reconciler.finish()
+
+    with METRICS.span("write"):
+        writer.close()
+    if not writer.failed:
+        checkpoint.save()
+
+    print("\n--- SUMMARY ---")
+    if incremental:
+        print(f"Unchanged:   {unchanged_count}")
+    for reconciler in reconcilers:
+        if len(reconcilers) > 1:
+            print(f"[{reconciler.name}]")
+        reconciler.print_summary()
+    if hasattr(ffbb_client, 'report'):
+        ffbb_client.report()
+    METRICS.report()
+    if metrics_path:
+        METRICS.write(metrics_path, run=checkpoint_name, apply=apply)
+    return writer
+
+def reconcile_batch(docs, index, reconcilers, checkpoint, writer, apply, incremental, pool=None, report=None):
+    """
+    Matches `docs` against the index, on `pool` when given, and runs the
+    reconcilers over them, queueing corrections on `writer` and findings on
+    `report`. Returns how many docs the checkpoint showed unchanged.
+    """
+    unchanged_count = 0
+    to_match, skipped = [], []
+    with METRICS.span("match"):
+        for doc, data in docs:
+            if not data.get("dateISO"):
+                for reconciler in reconcilers:
+                    reconciler.forget(doc.id)
+                continue
+            if incremental and checkpoint.unchanged(doc, index):
+                unchanged_count += 1
+                skipped.append(SyncItem(doc, data, index, checkpoint.result(doc, index)))
+                continue
+            checkpoint.forget(doc)
+            to_match.append((doc, data))
+        matches = [None] * len(to_match)
+        if pool:
+            matches = pool.match([(data.get("dateISO", ""), data.get("opponent", ""), data.get("team", ""), data.get("isHome"))
+                                  for doc, data in to_match])
+        items = [SyncItem(doc, data, index, match) for (doc, data), match in zip(to_match, matches)]
+    METRICS.incr("matches_unchanged", unchanged_count)
+    METRICS.incr("matches_checked", len(items))
+    for reconciler in reconcilers:
+        with METRICS.span(f"prepare_{reconciler.name}"):
+            if skipped:
+                reconciler.skip(skipped, index)
+            if items:
+                reconciler.prepare(items, index)
+    if not items:
+        return unchanged_count
+
+    with METRICS.span("reconcile"):
+        for item in items:
+            updates = {}
+            for reconciler in reconcilers:
+                updates.update(reconciler.check(item) or {})
+            if report:
+                report.add_item(item, updates)
+            if updates:
+                METRICS.incr("matches_corrected")
+                if apply:
+                    writer.update(item.id, updates)
+                    print("    -> QUEUED")
+            elif not item.unresolved:
+                checkpoint.record(item.doc, item.match.best)
+    return unchanged_count
+
+def add_apply_argument(parser, help="Write corrections to Firestore."):
+    parser.add_argument("--apply", action="store_true", help=help)
+
+def add_batch_argument(parser):
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE, help="Writes per Firestore batch commit (max 500).")
+
+def add_sync_arguments(parser):
+    add_batch_argument(parser)
+    add_fetch_arguments(parser)
+    add_date_arguments(parser)
+    parser.add_argument("--incremental", action="store_true", help="Only re-check matches changed in Firestore or FFBB since the last run.")
+    add_club_arguments(parser)
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Read Firestore while the FFBB index builds, then reconcile dates as the read completes them.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Match documents on this many processes, sharded by date (default: 1, in-process).")
+    parser.add_argument("--profile", dest="profile_dir", metavar="DIR",
+                        help="Profile the run (cProfile, tracemalloc, peak RSS per stage) and write the reports to DIR.")
+    parser.add_argument("--report", dest="report_path", metavar="PATH",
+                        help="Stream every change, ambiguous or unmatched doc and venue conflict here: JSON lines, or CSV for a .csv path.")
+    parser.add_argument("--metrics", dest="metrics_path",
+                        help="Write stage timings and counters here: a .prom Prometheus textfile, otherwise appended JSON lines.")
+
+def game_minutes_arg(value):
+    # "U11=75,SE=120" -> {"U11": 75, "SE": 120}
+    minutes = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        category, _, count = part.partition("=")
+        if not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"expected CATEGORY=MINUTES, got {part!r}")
+        minutes[category.strip().upper()] = int(count)
+    return minutes
+
+def add_conflict_arguments(parser):
+    parser.add_argument("--game-minutes", type=game_minutes_arg, default={}, metavar="CAT=MIN,...",
+                        help="Game durations overriding the conflict reconciler's defaults, e.g. U11=75,SE=120.")
+    parser.add_argument("--turnaround", type=int, default=MIN_TURNAROUND,
+                        help=f"Minutes needed between two games in the same gym (default: {MIN_TURNAROUND}).")
+
+def add_reconciler_arguments(parser):
+    parser.add_argument("--only", type=reconciler_names, default=list(RECONCILERS),
+                        help=f"Comma-separated reconcilers to run (default: {','.join(RECONCILERS)}).")
+    add_conflict_arguments(parser)
+
+def build_reconcilers(args, client):
+    # One gazetteer for all, in RECONCILERS order: the conflict reconciler then
+    # places docs by the salles the address reconciler just fetched
+    gazetteer = VenueGazetteer()
+    options = {
+        "address": dict(gazetteer=gazetteer),
+        "conflict": dict(gazetteer=gazetteer, game_minutes=args.game_minutes, turnaround=args.turnaround),
+    }
+    return [RECONCILERS[name](client, **options.get(name, {})) for name in RECONCILERS if name in args.only]
+
+def sync_options(args):
+    return dict(flush_size=args.batch_size, date_from=args.date_from, date_to=args.date_to, incremental=args.incremental,
+                club_ids=args.clubs, metrics_path=args.metrics_path,
+                profile_dir=args.profile_dir, pipeline=args.pipeline, workers=args.workers,
+                report_path=args.report_path)
+
+def reconciler_names(value):
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in RECONCILERS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown reconciler(s): {', '.join(unknown)} (choose from {', '.join(RECONCILERS)})")
+    return names
+
+# --- Watch ---
+
+WATCH_DEBOUNCE = 2.0 # seconds without a new change before a batch is checked
+WATCH_MAX_DELAY = 10.0 # ...but never later than this after its first change
+WATCH_INDEX_REFRESH = 30 * 60 # seconds between FFBB index rebuilds
+
+class MatchWatcher:
+    """
+    Keeps the Firestore matches from `date_from` on verified as they change.
+    An on_snapshot listener queues the documents whose synced fields
+    (MATCH_FIELDS) changed. Volunteer and carpool edits don't count. A worker
+    thread waits for a quiet period of `debounce` seconds, then reconciles the
+    queued documents against the in-memory FFBB index and commits the
+    corrections as one batched write. The index is rebuilt in the background
+    every `refresh_interval` seconds, and the documents on dates whose FFBB
+    games changed are checked again. Corrections come back as changes too:
+    checking them once more confirms them without writing.
+
+    Verified documents are recorded in a checkpoint per set of reconcilers,
+    as for --incremental runs. On a restart, the initial snapshot skips the
+    documents unchanged since then, in Firestore and in FFBB.
+    """
+    def __init__(self, db, ffbb_client, reconcilers, apply=False, club_ids=None, date_from=None,
+                 debounce=WATCH_DEBOUNCE, max_delay=WATCH_MAX_DELAY, refresh_interval=WATCH_INDEX_REFRESH,
+                 flush_size=WRITE_BATCH_SIZE):
+        self.db = db
+        self.ffbb_client = ffbb_client
+        self.reconcilers = reconcilers
+        self.apply = apply
+        self.club_ids = club_ids or DEFAULT_CLUB_IDS
+        self.date_from = date_from
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.refresh_interval = refresh_interval
+        self.flush_size = flush_size
+        self.index = None
+        self.checkpoint = Checkpoint("watch-" + "+".join(sorted(r.name for r in reconcilers)))
+        self.restored = bool(self.checkpoint.matches) # the first batch is the initial snapshot
+        self.docs = {} # doc id -> (doc, data) last seen
+        self.seen = {} # doc id -> synced field values last queued
+        self.pending = {} # doc id -> (doc, data) to check
+        self.removed = set() # ids of deleted docs, for Reconciler.forget()
+        self.last_change = 0.0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._listener = None
+
+    def start(self):
+        with METRICS.span("index"):
+            self.index = FFBBMatchIndex.build(self.ffbb_client, self.club_ids)
+        if self.index is None:
+            return False
+        for target, name in ((self._work, "watch-worker"), (self._refresh_loop, "watch-index")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        query = self.db.collection("matches")
+        if self.date_from:
+            query = query.where("dateISO", ">=", self.date_from)
+        self._listener = query.on_snapshot(self._on_snapshot)
+        print(f"Watching matches{f' from {self.date_from}' if self.date_from else ''} "
+              f"({'APPLY' if self.apply else 'DRY RUN'} MODE, {', '.join(r.name for r in self.reconcilers)})...")
+        return True
+
+    def stop(self):
+        if self._listener:
+            self._listener.unsubscribe()
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        for reconciler in self.reconcilers:
+            reconciler.finish()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Called on Firestore's listener thread: only queue
+        queued = 0
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    self.docs.pop(doc.id, None)
+                    self.seen.pop(doc.id, None)
+                    self.pending.pop(doc.id, None)
+                    self.removed.add(doc.id)
+                    queued += 1
+                    continue
+                doc, data = read_match(doc)
+                self.docs[doc.id] = (doc, data)
+                synced = tuple(data.get(field) for field in MATCH_FIELDS)
+                if self.seen.get(doc.id) == synced:
+                    continue
+                self.seen[doc.id] = synced
+                self.pending[doc.id] = (doc, data)
+                queued += 1
+            if queued:
+                METRICS.incr("watch_changes", queued)
+                self.last_change = time.monotonic()
+                self._wake.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            first = time.monotonic()
+            while not self._stop.is_set():
+                now = time.monotonic()
+                wait = min(self.last_change + self.debounce, first + self.max_delay) - now
+                if wait <= 0:
+                    break
+                self._stop.wait(wait)
+            with self._lock:
+                batch, self.pending = list(self.pending.values()), {}
+                removed, self.removed = self.removed, set()
+                self._wake.clear()
+            for doc_id in removed:
+                for reconciler in self.reconcilers:
+                    reconciler.forget(doc_id)
+            if batch:
+                self.check(batch)
+
+    def check(self, batch):
+        """
+        Reconciles `batch` [(doc, data), ...] and writes its corrections.
+        """
+        self.batches += 1
+        batch.sort(key=lambda entry: (entry[1].get("dateISO") or "", entry[0].id))
+        print(f"\n[{time.strftime('%H:%M:%S')}] Checking {len(batch)} changed match{'es' if len(batch) > 1 else ''}...")
+        writer = BatchWriter(self.db, flush_size=self.flush_size)
+        try:
+            # Only the initial snapshot holds documents that may not have changed
+            restored, self.restored = self.restored, False
+            unchanged = reconcile_batch(batch, self.index, self.reconcilers, self.checkpoint, writer, self.apply, restored)
+            if unchanged:
+                print(f"{unchanged} matches unchanged since the last watch.")
+            with METRICS.span("write"):
+                writer.close()
+            if not writer.failed:
+                self.checkpoint.save()
+        except Exception as e:
+            # Keep watching: the next change or index refresh checks these documents again
+            print(f"Error checking {len(batch)} matches: {e}")
+            with self._lock:
+                for doc, data in batch:
+                    self.seen.pop(doc.id, None)
+        METRICS.incr("watch_batches")
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_index()
+            except Exception as e:
+                print(f"Error refreshing the FFBB index: {e}")
+
+    def refresh_index(self):
+        """
+        Rebuilds the FFBB index and queues the documents dated on a day where
+        an FFBB game was added, removed or moved (date, time or salle).
+        """
+        with METRICS.span("index"):
+            index = FFBBMatchIndex.build(self.ffbb_client, self.club_ids)
+        if index is None:
+            print("FFBB index refresh failed, keeping the previous one.")
+            return
+        old, self.index = self.index, index
+        dates = {entry.date for rid, entry in index.by_id.items()
+                 if rid not in old.by_id or old.by_id[rid].fingerprint != entry.fingerprint}
+        dates.update(entry.date for rid, entry in old.by_id.items() if rid not in index.by_id)
+        with self._lock:
+            for doc_id, (doc, data) in self.docs.items():
+                if data.get("dateISO") in dates:
+                    self.pending[doc_id] = (doc, data)
+            if self.pending:
+                self.last_change = time.monotonic()
+                self._wake.set()
+
+    def print_summary(self):
+        print(f"\n--- SUMMARY ({self.batches} batches) ---")
+        for reconciler in self.reconcilers:
+            if len(self.reconcilers) > 1:
+                print(f"[{reconciler.name}]")
+            reconciler.print_summary()
+        METRICS.report()
+
+def cmd_watch(args):
+    db = init_firebase()
+    client = init_ffbb_from_args(args)
+    reconcilers = build_reconcilers(args, client)
+    watcher = MatchWatcher(db, client, reconcilers, apply=args.apply, club_ids=args.clubs, date_from=args.date_from,
+                           debounce=args.debounce, refresh_interval=args.refresh_minutes * 60, flush_size=args.batch_size)
+    if not watcher.start():
+        return
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    watcher.stop()
+    watcher.print_summary()
+
+# --- Season import ---
+
+IMPORT_ID_PREFIX = "ffbb-"
+IMPORT_GET_BATCH = 300 # documents per get_all round trip
+IMPORT_RECORD_FIELD = "ffbbImport" # FFBB fields as of the last import, to tell FFBB changes from app edits
+
+# Display date as written by the app's CSV import: "Samedi 14 Décembre 2024"
+WEEKDAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+MONTHS = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin", "Juillet", "Août",
+          "Septembre", "Octobre", "Novembre", "Décembre"]
+
+def import_doc_id(rencontre_id):
+    # Deterministic, so re-running the import updates instead of duplicating
+    return f"{IMPORT_ID_PREFIX}{rencontre_id}"
+
+def display_date(date_iso):
+    d = date.fromisoformat(date_iso)
+    return f"{WEEKDAYS[d.weekday()]} {d.day} {MONTHS[d.month - 1]} {d.year}"
+
+def default_roles(team):
+    roles = [(name, capacity) for name, capacity in DEFAULT_ROLES if not (name == "Goûter" and team in NO_GOUTER_TEAMS)]
+    return [{"id": str(n), "name": name, "capacity": capacity or float("inf"), "volunteers": []}
+            for n, (name, capacity) in enumerate(roles, start=1)]
+
+def imported_fields(entry):
+    """
+    The fields of a match document that come from FFBB, written the way the
+    app writes them (times as "15H00").
+    """
+    opponent = entry.nomEquipe2 if entry.is_home else entry.nomEquipe1
+    return {
+        "team": local_team_name(entry.category, entry.gender, entry.team_num),
+        "opponent": ffbb_club_name(opponent),
+        "date": display_date(entry.date),
+        "dateISO": entry.date,
+        "time": entry.time.replace(':', 'H') if entry.time else "",
+        "isHome": entry.is_home,
+    }
+
+def import_value_key(field, value):
+    # What two spellings of an imported field must share to be the same value
+    if field == "time":
+        return normalize_local_time(value or "")
+    if field == "team":
+        return parse_team_key(value or "")
+    if field == "opponent":
+        return normalize_team_name(value or "")
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+def import_changes(current, fields):
+    """
+    The FFBB fields to write on a previously imported document: those whose
+    FFBB value changed since the last import and that the document doesn't
+    already hold. A field FFBB didn't change keeps its value, so times, teams,
+    opponents and dates edited in the app are not reverted. A document
+    imported before the last import was recorded keeps all its fields.
+    """
+    last = current.get(IMPORT_RECORD_FIELD) or {}
+    changes = {}
+    for field, value in fields.items():
+        key = import_value_key(field, value)
+        if field not in last or import_value_key(field, last[field]) == key:
+            continue
+        if import_value_key(field, current.get(field)) != key:
+            changes[field] = value
+    return changes
+
+def import_season(db, ffbb_client, apply=False, club_ids=None, date_from=None, date_to=None,
+                  flush_size=WRITE_BATCH_SIZE, gazetteer=None):
+    """
+    Upserts a `matches` document for every game of our primary club in the
+    FFBB index, in [date_from, date_to]. Documents get the id
+    "ffbb-<rencontre id>", and home games get the app's default roles.
+
+    Safe to re-run: an imported document only gets the FFBB fields that
+    changed since the last import (see import_changes), plus a location when
+    its own is incomplete. Its roles, carpool and other edits are kept. A game already entered by hand (found by the
+    matcher, even ambiguously) is not imported a second time.
+    """
+    print(f"\n--- {'APPLY' if apply else 'DRY RUN'} MODE (import season) ---\n")
+    with METRICS.span("index"):
+        index = FFBBMatchIndex.build(ffbb_client, club_ids or DEFAULT_CLUB_IDS)
+    if index is None:
+        return None
+    gazetteer = gazetteer or VenueGazetteer()
+
+    games = sorted((entry for entry in index.by_id.values()
+                    if entry.involves_us and entry.club_rank == 0 and entry.category != "UNKNOWN"
+                    and (not date_from or entry.date >= date_from) and (not date_to or entry.date <= date_to)),
+                   key=lambda entry: (entry.date, entry.time or "", str(entry.id)))
+    print(f"{len(games)} games of our club in the FFBB index.")
+
+    # Previously imported documents, by their deterministic ids
+    collection = db.collection("matches")
+    imported = {}
+    with METRICS.span("firestore_read"):
+        for start in range(0, len(games), IMPORT_GET_BATCH):
+            refs = [collection.document(import_doc_id(entry.id)) for entry in games[start:start + IMPORT_GET_BATCH]]
+            for doc in db.get_all(refs):
+                if doc.exists:
+                    imported[doc.id] = doc.to_dict()
+        # Documents entered by hand, through the app or its CSV import
+        entered = {} # rencontre id -> doc id
+        for doc, data in map(read_match, query_matches(db, date_from, date_to)):
+            if doc.id.startswith(IMPORT_ID_PREFIX) or not data.get("dateISO"):
+                continue
+            result = find_match(index, data["dateISO"], data.get("opponent", ""), parse_team_key(data.get("team", "")),
+                                data.get("isHome"))
+            claimed = [result.best] if result.best else [entry for _, entry in result.ranked]
+            for entry in claimed:
+                entered.setdefault(entry.id, doc.id)
+
+    # Venues: fetch the salles the gazetteer doesn't know yet, concurrently
+    to_locate = [entry for entry in games if entry.id not in entered
+                 and is_incomplete_location(imported.get(import_doc_id(entry.id), {}).get("location", ""))]
+    salle_ids = {entry.salle_id for entry in to_locate if entry.salle_id is not None and not gazetteer.salle(entry.salle_id)}
+    if salle_ids:
+        print(f"Fetching {len(salle_ids)} new salles from FFBB...")
+        workers = getattr(ffbb_client, 'concurrency', 5)
+        for _ in fetch_many(lambda sid: get_salle_address(sid, ffbb_client, gazetteer), salle_ids, workers):
+            pass
+    locations = {}
+    for entry in to_locate:
+        location = get_salle_address(entry.salle_id, ffbb_client, gazetteer) if entry.salle_id is not None else None
+        if not location and not entry.is_home:
+            hit = gazetteer.match_team(imported_fields(entry)["opponent"])
+            location = hit[0] if hit else None
+        locations[entry.id] = location or ""
+    gazetteer.save()
+
+    writer = BatchWriter(db, flush_size=flush_size)
+    created = updated = unchanged = hand_entered = 0
+    for entry in games:
+        doc_id = import_doc_id(entry.id)
+        fields = imported_fields(entry)
+        if entry.id in entered:
+            hand_entered += 1
+            continue
+        current = imported.get(doc_id)
+        if current is None:
+            data = dict(fields, location=locations[entry.id], roles=default_roles(fields["team"]) if entry.is_home else [],
+                        **{IMPORT_RECORD_FIELD: fields})
+            print(f"[{doc_id}] NEW: {fields['team']} vs {fields['opponent']} ({fields['dateISO']} {fields['time']}, "
+                  f"{'home' if entry.is_home else 'away'})")
+            created += 1
+            if apply:
+                writer.set(doc_id, data)
+            continue
+        changes = import_changes(current, fields)
+        if locations.get(entry.id) and locations[entry.id] != current.get("location"):
+            changes["location"] = locations[entry.id]
+        recorded = current.get(IMPORT_RECORD_FIELD) == fields
+        if not changes:
+            unchanged += 1
+            if apply and not recorded:
+                writer.set(doc_id, {IMPORT_RECORD_FIELD: fields}, merge=True)
+            continue
+        print(f"[{doc_id}] UPDATE: " + ", ".join(f"{field} {current.get(field)!r} -> {value!r}" for field, value in changes.items()))
+        updated += 1
+        if apply:
+            writer.set(doc_id, dict(changes, **{IMPORT_RECORD_FIELD: fields}), merge=True)
+
+    with METRICS.span("write"):
+        writer.close()
+
+    print("\n--- SUMMARY ---")
+    print(f"New:           {created}")
+    print(f"Updated:       {updated}")
+    print(f"Unchanged:     {unchanged}")
+    print(f"Entered by hand (not imported): {hand_entered}")
+    if hasattr(ffbb_client, 'report'):
+        ffbb_client.report()
+    return writer
+
+def cmd_import_season(args):
+    db = init_firebase()
+    client = init_ffbb_from_args(args)
+    import_season(db, client, apply=args.apply, club_ids=args.clubs, date_from=args.date_from, date_to=args.date_to,
+                  flush_size=args.batch_size)
+
+# --- Explain ---
+
+def describe_entry(entry):
+    side = f"our team {entry.team_num}, {'home' if entry.is_home else 'away'}" if entry.involves_us else "not our game"
+    return f"{entry.nomEquipe1} vs {entry.nomEquipe2} (ID: {entry.id}, {entry.time}, {entry.category}/{entry.gender}, {side})"
+
+def explain_match(index, date, team, opponent, is_home=None, label="Match", show_all=False):
+    """
+    Runs the production matcher for one local match and prints its decision
+    on every FFBB match of the day.
+    """
+    team_key = parse_team_key(team)
+    trace = []
+    result = find_match(index, date, opponent, team_key, is_home, trace=trace)
+
+    print(f"\n{label}: {team} vs {opponent} ({date}, isHome={is_home})")
+    print(f"    Local   : category={team_key.category} gender={team_key.gender} number={team_key.number}")
+    print(f"    FFBB    : {len(index.on_date(date))} matches on {date}")
+    hidden = 0
+    for decision in sorted(trace, key=lambda d: -d.score):
+        if not show_all and decision.verdict.startswith("opponent score below"):
+            hidden += 1
+            continue
+        print(f"    - [{decision.score:.2f}] {describe_entry(decision.entry)}")
+        print(f"          -> {decision.verdict}")
+    if hidden:
+        print(f"    ({hidden} more with an opponent score below {MATCH_MIN_SCORE}, --all to list them)")
+    if result.best:
+        print(f"    Result  : FFBB match {result.best.id} at {result.best.time}")
+    elif result.ambiguous:
+        print("    Result  : AMBIGUOUS, nothing would be written")
+    else:
+        print("    Result  : NOT FOUND, nothing would be written")
+    return result
+
+def cmd_explain(args):
+    client = init_ffbb_from_args(args)
+    index = FFBBMatchIndex.build(client, args.clubs)
+    if index is None:
+        return
+    if args.no_firestore:
+        explain_match(index, args.date, args.team or "", args.opponent or "", args.is_home, show_all=args.all)
+        return
+
+    if args.local:
+        source = open_snapshot(args.snapshot)
+        if source is None:
+            return
+        docs = source.query(args.date, args.date)
+    else:
+        docs = query_matches(init_firebase(), args.date, args.date)
+    found = 0
+    for doc in docs:
+        data = doc.to_dict()
+        team, opponent = data.get("team", ""), data.get("opponent", "")
+        if args.team and args.team.lower() not in team.lower():
+            continue
+        if args.opponent and args.opponent.lower() not in opponent.lower():
+            continue
+        found += 1
+        print(f"\n[{doc.id}] time={data.get('time')!r} location={data.get('location')!r}")
+        explain_match(index, args.date, team, opponent, data.get("isHome"), label="Firestore", show_all=args.all)
+    if not found:
+        print(f"\nNo {'local' if args.local else 'Firestore'} match on {args.date} for team {args.team!r} / opponent {args.opponent!r}.")
+
+def add_explain_arguments(parser, default_date=None):
+    parser.add_argument("--date", type=iso_date, required=default_date is None, default=default_date, help="Match date (YYYY-MM-DD).")
+    parser.add_argument("--team", help="Local team, e.g. 'U11 M1' (substring of the Firestore team).")
+    parser.add_argument("--opponent", help="Opponent (substring of the Firestore opponent).")
+    parser.add_argument("--no-firestore", action="store_true",
+                        help="Explain --team vs --opponent directly instead of the stored matches.")
+    parser.add_argument("--all", action="store_true", help="Also list the matches whose opponent is nowhere close.")
+    add_snapshot_arguments(parser)
+    side = parser.add_mutually_exclusive_group()
+    side.add_argument("--home", action="store_const", const=True, dest="is_home", help="With --no-firestore: a home game.")
+    side.add_argument("--away", action="store_const", const=False, dest="is_home", help="With --no-firestore: an away game.")
+    add_club_arguments(parser)
+    add_fetch_arguments(parser)
+
+# --- Local snapshot ---
+
+def cmd_snapshot(args):
+    db = init_firebase()
+    snapshot = MatchSnapshot(args.snapshot)
+    previous = snapshot.meta("last_refresh")
+    print(f"Refreshing {args.snapshot} ({'full' if args.full or not previous else f'changes since {previous}'})...")
+    counts = snapshot.refresh(db, full=args.full)
+    print(f"Added: {counts['added']}, updated: {counts['updated']}, deleted: {counts['deleted']}, unchanged: {counts['unchanged']}")
+    print(f"{len(snapshot)} matches in the snapshot.")
+    snapshot.close()
+
+# --- Analytics ---
+
+def cmd_export(args):
+    if not analytics.require_pyarrow():
+        return
+    snapshot = MatchSnapshot(args.snapshot)
+    if not args.no_refresh:
+        counts = snapshot.refresh(init_firebase())
+        print(f"Snapshot refreshed: {counts['added']} added, {counts['updated']} updated, {counts['deleted']} deleted.")
+    counts = analytics.export_season_data(snapshot, args.out, args.format)
+    snapshot.close()
+    for name, rows in counts.items():
+        print(f"{name:<11} {rows:>7} rows")
+    print(f"Exported to {args.out} ({args.format}, partitioned by season).")
+
+def cmd_report(args):
+    if not analytics.require_pyarrow():
+        return
+    try:
+        table = analytics.run_report(args.report, args.data, args.season)
+    except FileNotFoundError as e:
+        print(e)
+        return
+    if args.csv:
+        analytics.write_csv(table, args.csv)
+        print(f"{table.num_rows} rows written to {args.csv}")
+    else:
+        analytics.print_table(table, args.limit)
+
+def cmd_run(args):
+    db = init_firebase()
+    if args.apply_from:
+        apply_report(db, args.apply_from, apply=args.apply, flush_size=args.batch_size)
+        return
+    client = init_ffbb_from_args(args)
+    reconcilers = build_reconcilers(args, client)
+    run_sync(db, client, reconcilers, apply=args.apply, **sync_options(args))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile Firestore matches with FFBB.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Check (and with --apply, fix) matches against FFBB.")
+    add_reconciler_arguments(run_parser)
+    add_apply_argument(run_parser)
+    run_parser.add_argument("--apply-from", metavar="REPORT",
+                            help="Replay the changes of a reviewed --report file instead of checking FFBB (writes only with --apply).")
+    add_sync_arguments(run_parser)
+    run_parser.set_defaults(func=cmd_run)
+
+    explain_parser = subparsers.add_parser("explain", help="Show the matcher's decision for the matches of one date.")
+    add_explain_arguments(explain_parser)
+    explain_parser.set_defaults(func=cmd_explain)
+
+    watch_parser = subparsers.add_parser("watch", help="Verify (and with --apply, fix) matches as they are created or edited.")
+    add_reconciler_arguments(watch_parser)
+    add_apply_argument(watch_parser)
+    watch_parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                              help=f"Seconds without new changes before checking them (default: {WATCH_DEBOUNCE}).")
+    watch_parser.add_argument("--refresh-minutes", type=float, default=WATCH_INDEX_REFRESH / 60,
+                              help=f"Minutes between FFBB index rebuilds (default: {WATCH_INDEX_REFRESH // 60}).")
+    add_batch_argument(watch_parser)
+    add_club_arguments(watch_parser)
+    add_fetch_arguments(watch_parser)
+    watch_parser.add_argument("--from", dest="date_from", type=iso_date, default=date.today().isoformat(),
+                              help="Watch matches from this date on (YYYY-MM-DD, default: today).")
+    watch_parser.set_defaults(func=cmd_watch)
+
+    import_parser = subparsers.add_parser("import-season", help="Create (or update) match documents for our FFBB games.")
+    add_apply_argument(import_parser, help="Write the documents to Firestore.")
+    add_batch_argument(import_parser)
+    add_club_arguments(import_parser, note="; games of the first one are imported")
+    add_fetch_arguments(import_parser)
+    add_date_arguments(import_parser)
+    import_parser.set_defaults(func=cmd_import_season)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Mirror the matches collection into the local SQLite snapshot.")
+    snapshot_parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help=f"Snapshot file (default: {SNAPSHOT_PATH}).")
+    snapshot_parser.add_argument("--full", action="store_true", help="Re-fetch every document, not only the changed ones.")
+    snapshot_parser.set_defaults(func=cmd_snapshot)
+
+    export_parser = subparsers.add_parser("export", help="Export matches, roles and carpools as season-partitioned Parquet/Arrow.")
+    export_parser.add_argument("--out", default=analytics.ANALYTICS_DIR, help=f"Output directory (default: {analytics.ANALYTICS_DIR}).")
+    export_parser.add_argument("--format", choices=list(analytics.EXPORT_FORMATS), default="parquet", help="File format (default: parquet).")
+    export_parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help=f"Local snapshot file (default: {SNAPSHOT_PATH}).")
+    export_parser.add_argument("--no-refresh", action="store_true", help="Export the local snapshot as is, without reading Firestore.")
+    export_parser.set_defaults(func=cmd_export)
+
+    report_parser = subparsers.add_parser("report", help="Staffing and carpool reports over the export.")
+    report_parser.add_argument("report", choices=list(analytics.REPORTS),
+                               help="unfilled: missing volunteers per team and weekend; volunteers: load per person; "
+                                    "carpool: seats vs passengers per team and weekend.")
+    report_parser.add_argument("--season", help="Only this season, e.g. 2025-2026.")
+    report_parser.add_argument("--data", default=analytics.ANALYTICS_DIR, help=f"Export directory (default: {analytics.ANALYTICS_DIR}).")
+    report_parser.add_argument("--limit", type=int, default=50, help="Rows to print (default: 50).")
+    report_parser.add_argument("--csv", help="Write the whole report to this CSV file instead of printing it.")
+    report_parser.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    args.func(args)
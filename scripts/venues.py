@@ -0,0 +1,211 @@
+"""
+Venue gazetteer: every gym address we know, in one persistent, indexed store.
+Merges the curated KNOWN_VENUES, the web app's GYM_REGISTRY (src/utils/gyms.ts)
+and every FFBB salle fetched so far, so most locations resolve without an API call.
+"""
+from shared import CHECKPOINT_DIR
+from datetime import datetime
+import json
+import os
+import re
+import threading
+import unicodedata
+
+KNOWN_VENUES = {
+    "Maison des Sports": "Maison des Sports, Place des Bughes, 63000 Clermont-Ferrand",
+    "Gymnase Fleury": "Gymnase Fleury, Rue Pierre de Coubertin, 63000 Clermont-Ferrand",
+    "Gymnase Granouillet": "Gymnase Granouillet, 45 Rue de Châteaudun, 63000 Clermont-Ferrand",
+    "Gymnase Autun": "Gymnase Autun, Rue d'Autun, 63000 Clermont-Ferrand",
+    "Gymnase Thevenet": "Gymnase Thevenet, Rue de la Grande Tour, 63000 Clermont-Ferrand",
+    "Complexe Sportif Paul Bourissou": "Complexe Sportif Paul Bourissou, Rue du stade, 63960 Veyre-Monton",
+}
+
+GYMS_TS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'utils', 'gyms.ts')
+VENUES_PATH = os.path.join(CHECKPOINT_DIR, 'venues.json')
+
+# Tokens too common in venue names to identify one on their own
+GENERIC_TOKENS = {
+    "gymnase", "salle", "salles", "sports", "sport", "sportif", "sportive", "complexe", "halle", "palais",
+    "espace", "parc", "municipal", "omnisport", "omnisports", "cosec", "stade",
+    "de", "des", "du", "la", "le", "les", "l", "d", "et", "rue", "avenue",
+}
+
+# `KEY: 'value'`, `'KEY': "value"`, possibly split over two lines
+GYM_ENTRY_PATTERN = re.compile(r"""(?:'([^']+)'|"([^"]+)"|([A-Za-z_][\w]*))\s*:\s*(?:'([^']*)'|"([^"]*)")""")
+
+def name_tokens(text):
+    # "Gymnase J.P. Cherblanc" -> ("gymnase", "j", "p", "cherblanc")
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return tuple(re.findall(r"[a-z0-9]+", text.lower()))
+
+def contains_tokens(haystack, needle):
+    # True when `needle` appears as a contiguous run of tokens in `haystack`
+    n = len(needle)
+    return any(haystack[i:i + n] == needle for i in range(len(haystack) - n + 1))
+
+def load_gym_registry(path=GYMS_TS_PATH):
+    """
+    Reads GYM_REGISTRY (team or town -> address) out of the web app's gyms.ts.
+    Returns {} when the file is not there (scripts deployed on their own).
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    start = source.find("GYM_REGISTRY")
+    if start < 0:
+        return {}
+    body = source[source.find("{", start) + 1:source.find("};", start)]
+    body = re.sub(r"//[^\n]*", "", body)
+    registry = {}
+    for m in GYM_ENTRY_PATTERN.finditer(body):
+        key = m.group(1) or m.group(2) or m.group(3)
+        registry[key] = m.group(4) if m.group(4) is not None else m.group(5)
+    return registry
+
+def salle_address(data):
+    """
+    "Name, street, postcode town" from an FFBB salle payload (dict).
+    """
+    nom = data.get("libelle") or data.get("nom")
+    adresse = data.get("adresse") or data.get("adresse1")
+    cp = data.get("code_postal") or data.get("codePostal", "")
+    ville = data.get("ville") or data.get("commune", "")
+    if isinstance(ville, dict):
+        ville = ville.get("libelle", "")
+
+    full_addr = str(adresse) if adresse else ""
+    if cp or ville:
+        full_addr += f", {cp} {ville}".rstrip()
+
+    if nom and nom.lower() not in full_addr.lower():
+        full_addr = f"{nom}, {full_addr}"
+    return full_addr
+
+class VenueGazetteer:
+    """
+    Addresses indexed by salle id, by rencontre id (the salle an FFBB game is
+    played in) and by the distinctive tokens of venue and team names. The
+    fetched part is saved to `path`. KNOWN_VENUES and gyms.ts are reloaded
+    from source on every run.
+    """
+    def __init__(self, path=VENUES_PATH, gym_registry_path=GYMS_TS_PATH):
+        self.path = path
+        self.salles = {} # salle id -> {"name", "address"}
+        self.rencontres = {} # rencontre id -> salle id
+        self.dirty = False
+        self._lock = threading.Lock()
+        # Name lookups, token -> [(tokens, address, source), ...]
+        self._known_tokens = {} # KNOWN_VENUES
+        self._salle_tokens = {} # names of fetched salles
+        self._team_tokens = {} # GYM_REGISTRY
+        self._salle_entries = {} # salle id -> its entry in _salle_tokens
+
+        for name, address in KNOWN_VENUES.items():
+            self._add_name(self._known_tokens, name, address, "Known Venue Map")
+        for name, address in load_gym_registry(gym_registry_path).items():
+            self._add_name(self._team_tokens, name, address, "Gym Registry")
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.rencontres = data.get("rencontres", {})
+            for salle_id, salle in data.get("salles", {}).items():
+                self._store_salle(salle_id, salle["name"], salle["address"])
+
+    @staticmethod
+    def _add_name(index, name, address, source):
+        tokens = name_tokens(name)
+        distinctive = {t for t in tokens if t not in GENERIC_TOKENS}
+        if not distinctive:
+            return None # "Gymnase", "Salle des Sports": would match anything
+        entry = (tokens, address, source)
+        for token in distinctive:
+            index.setdefault(token, []).append(entry)
+        return entry
+
+    @staticmethod
+    def _remove_name(index, entry):
+        for token in set(entry[0]):
+            if entry in index.get(token, ()):
+                index[token].remove(entry)
+
+    def _store_salle(self, salle_id, name, address):
+        salle_id = str(salle_id)
+        self.salles[salle_id] = {"name": name, "address": address}
+        old = self._salle_entries.pop(salle_id, None)
+        if old:
+            self._remove_name(self._salle_tokens, old)
+        if name:
+            entry = self._add_name(self._salle_tokens, name, address, f"FFBB Salle {salle_id}")
+            if entry:
+                self._salle_entries[salle_id] = entry
+
+    @staticmethod
+    def _lookup(index, text):
+        """
+        Address of the longest indexed name found in `text`, or None when
+        nothing matches or equally long names disagree.
+        """
+        tokens = name_tokens(text)
+        seen = {}
+        for token in set(tokens):
+            for entry in index.get(token, ()):
+                seen[id(entry)] = entry
+        found = [entry for entry in seen.values() if contains_tokens(tokens, entry[0])]
+        if not found:
+            return None
+        longest = max(len(entry[0]) for entry in found)
+        best = [entry for entry in found if len(entry[0]) == longest]
+        if len({entry[1] for entry in best}) > 1:
+            return None
+        return best[0][1], best[0][2]
+
+    def match_known(self, location):
+        """
+        (address, source) for a location naming a KNOWN_VENUES venue.
+        """
+        return self._lookup(self._known_tokens, location)
+
+    def match_salle(self, location):
+        """
+        (address, source) for a location naming an FFBB salle fetched before.
+        """
+        return self._lookup(self._salle_tokens, location)
+
+    def match_team(self, name):
+        """
+        (address, source) of a team's home gym from GYM_REGISTRY.
+        """
+        return self._lookup(self._team_tokens, name)
+
+    def salle(self, salle_id):
+        return self.salles.get(str(salle_id)) if salle_id is not None else None
+
+    def add_salle(self, salle_id, name, address):
+        with self._lock:
+            if self.salles.get(str(salle_id)) != {"name": name, "address": address}:
+                self._store_salle(salle_id, name, address)
+                self.dirty = True
+
+    def rencontre_salle(self, rencontre_id):
+        return self.rencontres.get(str(rencontre_id))
+
+    def add_rencontre(self, rencontre_id, salle_id):
+        with self._lock:
+            if self.rencontres.get(str(rencontre_id)) != str(salle_id):
+                self.rencontres[str(rencontre_id)] = str(salle_id)
+                self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self._lock:
+            data = {"updated": datetime.now().isoformat(timespec="seconds"),
+                    "salles": dict(self.salles), "rencontres": dict(self.rencontres)}
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
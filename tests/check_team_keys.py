@@ -0,0 +1,49 @@
+"""
+Golden-file check for the team name parser in scripts/shared.py.
+
+Usage: python tests/check_team_keys.py [--update]
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from shared import parse_team_key, extract_category_local, extract_gender_local, extract_team_number_local
+
+GOLDEN_PATH = os.path.join(ROOT, 'tests', 'golden', 'team_keys.json')
+
+def run(update=False):
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        rows = json.load(f)
+
+    if update:
+        for row in rows:
+            key = parse_team_key(row["name"])
+            row.update(category=key.category, gender=key.gender, number=key.number)
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Updated {len(rows)} entries in {GOLDEN_PATH}")
+        return True
+
+    failures = 0
+    for row in rows:
+        name = row["name"]
+        expected = (row["category"], row["gender"], row["number"])
+        key = tuple(parse_team_key(name))
+        single = (extract_category_local(name), extract_gender_local(name), extract_team_number_local(name))
+        if key != expected or single != expected:
+            failures += 1
+            print(f"MISMATCH {name!r}: expected {expected}, parse_team_key {key}, extractors {single}")
+
+    print(f"{len(rows) - failures}/{len(rows)} team names match the golden file: {'SUCCESS' if not failures else 'FAILURE'}")
+    return failures == 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--update', action='store_true', help="Rewrite the golden file from the current parser.")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.update) else 1)
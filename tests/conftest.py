@@ -0,0 +1,11 @@
+"""
+Puts scripts/ on the path and keeps the FFBB cache and checkpoints of the
+tests in a temporary directory.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+os.environ.setdefault('FFBB_CACHE_PATH', os.path.join(tempfile.mkdtemp(prefix='ffbb-tests-'), 'ffbb.sqlite'))
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from fakes import FakeFirestore
+from shared import Checkpoint, FFBBMatchIndex
+
+US = "STADE CLERMONTOIS BASKET AUVERGNE"
+
+def index_with(kickoff="14:00", salle_id="5001"):
+    index = FFBBMatchIndex()
+    index.add(SimpleNamespace(id="1", date_rencontre=f"2026-01-10T{kickoff}:00", nomEquipe1=f"{US} - 1",
+                              nomEquipe2="BC LEMPDES - 1", salle={"id": salle_id}), "U13", "M")
+    return index
+
+def snapshot(db):
+    return db.collection("matches").document("m1").get()
+
+def recorded(tmp_path):
+    db = FakeFirestore({"matches": {"m1": {"team": "U13 M1", "dateISO": "2026-01-10", "time": "14H00"}}})
+    checkpoint = Checkpoint("test", directory=str(tmp_path))
+    index = index_with()
+    checkpoint.record(snapshot(db), index.by_id["1"])
+    return db, checkpoint
+
+def test_unchanged_doc_and_match_are_skipped(tmp_path):
+    db, checkpoint = recorded(tmp_path)
+    assert checkpoint.unchanged(snapshot(db), index_with())
+    assert checkpoint.result(snapshot(db), index_with()).best.id == "1"
+
+def test_changed_ffbb_fingerprint_is_checked_again(tmp_path):
+    db, checkpoint = recorded(tmp_path)
+    assert not checkpoint.unchanged(snapshot(db), index_with(kickoff="15:30"))
+    assert not checkpoint.unchanged(snapshot(db), index_with(salle_id="5002"))
+
+def test_edited_doc_is_checked_again(tmp_path):
+    db, checkpoint = recorded(tmp_path)
+    db.collection("matches").document("m1").update({"time": "15H30"})
+    assert not checkpoint.unchanged(snapshot(db), index_with())
+
+def test_saved_checkpoint_is_reloaded_and_forgets(tmp_path):
+    db, checkpoint = recorded(tmp_path)
+    checkpoint.save()
+    reloaded = Checkpoint("test", directory=str(tmp_path))
+    assert reloaded.unchanged(snapshot(db), index_with())
+    reloaded.forget(snapshot(db))
+    assert not reloaded.unchanged(snapshot(db), index_with())
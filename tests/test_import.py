@@ -0,0 +1,39 @@
+from fakes import FakeFFBBClient, FakeFirestore
+from sync import IMPORT_RECORD_FIELD, import_season
+from venues import VenueGazetteer
+
+def imported(tmp_path):
+    ffbb = FakeFFBBClient()
+    db = FakeFirestore({"matches": {}})
+    import_season(db, ffbb, apply=True, gazetteer=VenueGazetteer(str(tmp_path / "venues.json")))
+    doc_id = sorted(db.store("matches"))[0]
+    return ffbb, db, doc_id
+
+def reimport(tmp_path, db, ffbb):
+    return import_season(db, ffbb, apply=True, gazetteer=VenueGazetteer(str(tmp_path / "venues.json")))
+
+def stored(db, doc_id):
+    return db.store("matches")[doc_id][0]
+
+def test_times_are_written_like_the_app(tmp_path):
+    ffbb, db, doc_id = imported(tmp_path)
+    rencontre = ffbb.rencontres[int(doc_id[len("ffbb-"):])]
+    assert stored(db, doc_id)["time"] == rencontre.date_rencontre[11:16].replace(":", "H")
+
+def test_app_edits_are_kept_when_ffbb_did_not_change(tmp_path):
+    ffbb, db, doc_id = imported(tmp_path)
+    db.collection("matches").document(doc_id).update({"time": "9h15", "opponent": "Lempdes"})
+    commits = db.commits
+    reimport(tmp_path, db, ffbb)
+    assert stored(db, doc_id)["time"] == "9h15"
+    assert stored(db, doc_id)["opponent"] == "Lempdes"
+    assert db.commits == commits
+
+def test_ffbb_change_is_written_over_an_app_edit(tmp_path):
+    ffbb, db, doc_id = imported(tmp_path)
+    db.collection("matches").document(doc_id).update({"time": "9h15"})
+    rencontre = ffbb.rencontres[int(doc_id[len("ffbb-"):])]
+    rencontre.date_rencontre = rencontre.date_rencontre[:11] + "21:15:00"
+    reimport(tmp_path, db, ffbb)
+    assert stored(db, doc_id)["time"] == "21H15"
+    assert stored(db, doc_id)[IMPORT_RECORD_FIELD]["time"] == "21H15"
@@ -0,0 +1,18 @@
+from fakes import FakeFFBBClient
+from shared import FFBBMatchIndex
+
+PARTNER_ID = 10000 # one of the fake opponent clubs, taken as a partner
+MISSING_ID = 99999
+
+def partner_ranks(index):
+    return {entry.club_rank for entry in index.by_id.values() if entry.involves_us and entry.club_rank != 0}
+
+def test_partner_club_keeps_its_rank_when_another_fails():
+    client = FakeFFBBClient()
+    index = FFBBMatchIndex.build(client, [9326, MISSING_ID, PARTNER_ID])
+    assert index.club_keys[1] is None
+    assert partner_ranks(index) == {2}
+
+def test_missing_primary_club_aborts():
+    client = FakeFFBBClient()
+    assert FFBBMatchIndex.build(client, [MISSING_ID, PARTNER_ID]) is None
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from shared import FFBBMatchIndex, find_match, parse_team_key
+
+US = "STADE CLERMONTOIS BASKET AUVERGNE"
+
+def rencontre(rencontre_id, home, away, kickoff="14:00", salle_id="5001"):
+    return SimpleNamespace(id=rencontre_id, date_rencontre=f"2026-01-10T{kickoff}:00",
+                           nomEquipe1=home, nomEquipe2=away, salle={"id": salle_id})
+
+def test_single_game_matches():
+    index = FFBBMatchIndex()
+    index.add(rencontre("1", f"{US} - 1", "BC LEMPDES - 1"), "U13", "M")
+    result = find_match(index, "2026-01-10", "BC Lempdes", parse_team_key("U13 M1"), True)
+    assert result.best is not None and result.best.id == "1"
+    assert not result.ambiguous
+
+def test_ambiguous_opponent_is_not_matched():
+    # Two of our teams play the same opponent that day and the doc has no
+    # team to tell them apart
+    index = FFBBMatchIndex()
+    index.add(rencontre("1", f"{US} - 1", "BC LEMPDES - 1"), "U13", "M")
+    index.add(rencontre("2", f"{US} - 2", "BC LEMPDES - 2", kickoff="16:00"), "U13", "M")
+    result = find_match(index, "2026-01-10", "BC Lempdes", is_home=True)
+    assert result.best is None
+    assert result.ambiguous
+    assert {entry.id for score, entry in result.ranked} == {"1", "2"}
+
+def test_other_clubs_game_does_not_make_it_ambiguous():
+    index = FFBBMatchIndex()
+    index.add(rencontre("1", f"{US} - 1", "BC LEMPDES - 1"), "U13", "M")
+    index.add(rencontre("2", "BC LEMPDES - 2", "AL AUBIERE - 1", salle_id="5002"), "U13", "M")
+    result = find_match(index, "2026-01-10", "BC Lempdes", parse_team_key("U13 M1"))
+    assert result.best is not None and result.best.id == "1"
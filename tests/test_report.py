@@ -0,0 +1,28 @@
+import json
+
+from fakes import FakeFirestore
+from sync import apply_report
+
+def change(doc_id, field, current, proposed):
+    return {"id": f"{doc_id}:{field}", "kind": "change", "doc_id": doc_id, "date": "2026-01-10", "team": "U13 M1",
+            "opponent": "BC Lempdes", "field": field, "current": current, "proposed": proposed,
+            "source": "FFBB", "ffbb_id": "1", "candidates": None}
+
+def test_stale_row_is_skipped(tmp_path):
+    db = FakeFirestore({"matches": {
+        "m1": {"team": "U13 M1", "dateISO": "2026-01-10", "time": "14H00"},
+        "m2": {"team": "U15 M1", "dateISO": "2026-01-10", "time": "16H00"},
+    }})
+    path = tmp_path / "report.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in [
+        change("m1", "time", "14H00", "14H30"),
+        change("m2", "time", "16H00", "16H30"),
+    ]), encoding='utf-8')
+    # Edited in the app after the report was written
+    db.collection("matches").document("m2").update({"time": "17H00"})
+
+    writer = apply_report(db, str(path), apply=True)
+
+    assert writer.committed == ["m1"]
+    assert db.collection("matches").document("m1").get().get("time") == "14H30"
+    assert db.collection("matches").document("m2").get().get("time") == "17H00"